@@ -0,0 +1,426 @@
+# loading the Banner class search dumps (courses_fall25/searchResults*.json) into section records
+import glob
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import NamedTuple
+
+import numpy as np
+
+from registry import REGISTRY
+from scheduler import CourseScheduler
+
+
+log = logging.getLogger('scheduler.catalog')
+
+BANNER_DAYS = (('monday', 'M'), ('tuesday', 'T'), ('wednesday', 'W'), ('thursday', 'H'), ('friday', 'F'))
+
+
+class BannerSection(NamedTuple):
+    # only the fields the scheduler uses, the faculty/status decorator objects are dropped while reading
+    crn: str
+    subject_course: str
+    title: str
+    sequence: str
+    schedule_type: str
+    credits: float
+    max_enrollment: int
+    enrollment: int
+    seats_available: int
+    wait_available: int
+    open_section: bool
+    restricted: bool
+    cross_list: str
+    cross_list_available: int
+    link: str
+    room: str
+    times: tuple
+    mask: int
+
+
+def banner_time(begin, end, days):
+    # '0900', '1015' -> 'TH9-10:15', the format parse_time and convert_to_mask read (no am/pm,
+    # hours before 9 mean pm so 13:00 is written as 1). that only covers the 9am-9pm slot grid, so a
+    # meeting outside it is a ValueError instead of landing on the wrong slots
+    if not '0900' <= begin < end <= '2100':
+        raise ValueError(f"{days} {begin}-{end} is outside the 09:00-21:00 time slots")
+    def short(t):
+        hour, minute = int(t[:2]), int(t[2:])
+        if hour == 21:
+            return '21' # 9 would be 9am, to_minutes reads 21 as the end of the day
+        if hour > 12:
+            hour -= 12
+        return f"{hour}:{minute:02d}" if minute else str(hour)
+    return f"{days}{short(begin)}-{short(end)}"
+
+
+def read_section(record):
+    times = []
+    rooms = []
+    mask = 0
+    for meeting in record.get('meetingsFaculty') or []:
+        meeting_time = meeting.get('meetingTime') or {}
+        days = ''.join(letter for day, letter in BANNER_DAYS if meeting_time.get(day))
+        if not days or not meeting_time.get('beginTime') or not meeting_time.get('endTime'):
+            continue
+        time = banner_time(meeting_time['beginTime'], meeting_time['endTime'], days)
+        times.append(time)
+        mask |= CourseScheduler.convert_to_mask(time)
+        if meeting_time.get('room'):
+            rooms.append(meeting_time['room'])
+
+    status = record.get('status') or {}
+    return BannerSection(
+        crn=record['courseReferenceNumber'],
+        subject_course=record['subjectCourse'],
+        title=record.get('courseTitle') or record['subjectCourse'],
+        sequence=record.get('sequenceNumber') or '',
+        schedule_type=record.get('scheduleTypeDescription') or '',
+        credits=record.get('creditHours') or record.get('creditHourLow') or 0,
+        max_enrollment=record.get('maximumEnrollment') or 0,
+        enrollment=record.get('enrollment') or 0,
+        seats_available=record.get('seatsAvailable') or 0,
+        wait_available=record.get('waitAvailable') or 0,
+        open_section=bool(record.get('openSection')),
+        restricted=bool(status.get('restricted')),
+        cross_list=record.get('crossList') or '',
+        cross_list_available=record.get('crossListAvailable') or 0,
+        link=record.get('linkIdentifier') or '',
+        room=', '.join(rooms),
+        times=tuple(times),
+        mask=mask,
+    )
+
+
+def read_page(path):
+    # runs in the worker process, so the raw page never reaches the parent
+    with open(path) as f:
+        page = json.load(f)
+    sections = []
+    for record in page.get('data') or []:
+        try:
+            sections.append(read_section(record))
+        except ValueError as error:
+            # left out rather than scheduled at the wrong time
+            log.warning("skipping %s (CRN %s): %s", record.get('subjectCourse'), record.get('courseReferenceNumber'), error)
+    return sections
+
+
+def banner_pages(directory='courses_fall25'):
+    return sorted(glob.glob(os.path.join(directory, 'searchResults*.json')))
+
+
+def iter_sections(paths, workers=None):
+    # yields sections page by page as the workers finish them, workers=1 reads in this process
+    if workers == 1 or len(paths) < 2:
+        for path in paths:
+            yield from read_page(path)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for future in as_completed([pool.submit(read_page, path) for path in paths]):
+            yield from future.result()
+
+
+def is_lab(section):
+    # labs and the other linked parts (problem solving etc.) are chosen next to a lecture,
+    # a lab that isnt linked to anything is taken on its own like a lecture
+    return bool(section.link) and section.schedule_type != 'Lecture'
+
+
+def build_time_data(sections):
+    # same shape as time_data in scheduler_data.py, but sections are dicts keyed by CRN. the courses are
+    # made into registry records here, once, since the section dicts can't be interned and every
+    # CourseScheduler given plain dicts would make its own records again
+    courses = {}
+    for section in sections:
+        course = courses.setdefault(section.subject_course, {
+            'name': section.title,
+            'credits': 0,
+            'prerequisites': [],
+            'weight': 1,
+            'sections': [],
+            'labs': [],
+        })
+        course['credits'] = max(course['credits'], section.credits)
+        entry = {
+            'section': section.crn,
+            'time': section.times[0] if section.times else '',
+            'times': list(section.times),
+            'room': section.room,
+            'mask': section.mask,
+        }
+        course['labs' if is_lab(section) else 'sections'].append(entry)
+
+    for course in courses.values():
+        if not course['labs']:
+            del course['labs']
+    return REGISTRY.major(courses)
+
+
+def load_time_data(directory='courses_fall25', workers=None):
+    return build_time_data(iter_sections(banner_pages(directory), workers=workers))
+
+
+class SectionIndex:
+    # lookups over the whole catalog: by CRN, by course, and the cross list / link / type groups
+
+    def __init__(self, sections):
+        self.by_crn = {}
+        self.by_course = {}
+        self.by_cross_list = {}
+        self.by_link = {}
+        self.by_type = {}
+        for section in sections:
+            self.by_crn[section.crn] = section
+            self.by_course.setdefault(section.subject_course, []).append(section)
+            if section.cross_list:
+                self.by_cross_list.setdefault(section.cross_list, []).append(section)
+            if section.link:
+                self.by_link.setdefault((section.subject_course, section.link), []).append(section)
+            self.by_type.setdefault((section.subject_course, section.schedule_type), []).append(section)
+
+    def section(self, crn):
+        return self.by_crn[crn]
+
+    def course_sections(self, subject_course, schedule_type=None):
+        if schedule_type is None:
+            return self.by_course.get(subject_course, [])
+        return self.by_type.get((subject_course, schedule_type), [])
+
+    def cross_listed(self, crn):
+        # the other sections sharing this one's cross list seats
+        section = self.by_crn[crn]
+        if not section.cross_list:
+            return []
+        return [other for other in self.by_cross_list[section.cross_list] if other.crn != crn]
+
+    def link_group(self, crn):
+        # the other sections of the course with the same link identifier (e.g. all the L1 lectures)
+        section = self.by_crn[crn]
+        if not section.link:
+            return []
+        return [other for other in self.by_link[(section.subject_course, section.link)] if other.crn != crn]
+
+    def seats(self, crn):
+        # open seats, cross listed sections share one capacity so that one wins
+        section = self.by_crn[crn]
+        if section.cross_list:
+            return min(section.seats_available, section.cross_list_available)
+        return section.seats_available
+
+
+class SeatPolicy(NamedTuple):
+    # which sections a student can still register for
+    min_seats: int = 1
+    allow_waitlist: bool = False  # keep full sections that still have waitlist places
+    allow_closed: bool = False  # keep sections Banner marks as not open
+    # keep restricted sections. every section in the search dumps is marked restricted (the flag only says
+    # some registration restriction exists, not that it applies to the student), so with False nothing
+    # would be left
+    allow_restricted: bool = True
+    use_cross_list: bool = True  # cross listed sections are limited by the shared seats
+
+
+def available_sections(catalog, policy=SeatPolicy()):
+    # one pass over the catalog columns, returns a boolean array with a flag per section
+    columns = catalog.columns
+    seats = columns['seats_available']
+    if policy.use_cross_list:
+        not_cross_listed = catalog.string_id('')
+        cross_listed = columns['cross_list'] != not_cross_listed
+        seats = np.where(cross_listed, np.minimum(seats, columns['cross_list_available']), seats)
+    keep = seats >= policy.min_seats
+    if policy.allow_waitlist:
+        keep |= columns['wait_available'] > 0
+    if not policy.allow_closed:
+        keep &= columns['open_section'].astype(bool)
+    if not policy.allow_restricted:
+        keep &= ~columns['restricted'].astype(bool)
+    return keep
+
+
+def filter_sections(catalog, policy=SeatPolicy()):
+    return [catalog.section(i) for i in np.flatnonzero(available_sections(catalog, policy))]
+
+
+# compiled catalog file: a header, one fixed width array per field and a table of interned strings.
+# it is read through mmap so every worker process shares the same pages.
+CATALOG_MAGIC = b'CPCAT001'
+HEADER = struct.Struct('<8s32sIII')  # magic, sha256 of the source pages, sections, strings, string bytes
+MASK_WORDS = 4  # 4 x 64 bits covers the 5 x 48 slots of a week
+
+# (field, dtype), string fields are stored as ids into the string table
+COLUMNS = [
+    ('crn', '<u4'),
+    ('subject_course', '<i4'),
+    ('title', '<i4'),
+    ('sequence', '<i4'),
+    ('schedule_type', '<i4'),
+    ('credits', '<f4'),
+    ('max_enrollment', '<i4'),
+    ('enrollment', '<i4'),
+    ('seats_available', '<i4'),
+    ('wait_available', '<i4'),
+    ('open_section', '<u1'),
+    ('restricted', '<u1'),
+    ('cross_list', '<i4'),
+    ('cross_list_available', '<i4'),
+    ('link', '<i4'),
+    ('room', '<i4'),
+    ('times', '<i4'),
+    ('mask', '<u8'),
+]
+STRING_COLUMNS = {'subject_course', 'title', 'sequence', 'schedule_type', 'cross_list', 'link', 'room', 'times'}
+
+
+def _aligned(offset):
+    return (offset + 7) // 8 * 8
+
+
+def _column_size(name, dtype, count):
+    width = MASK_WORDS if name == 'mask' else 1
+    return np.dtype(dtype).itemsize * width * count
+
+
+def source_hash(paths):
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(os.path.basename(path).encode())
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.digest()
+
+
+def write_catalog(path, sections, digest):
+    strings = []
+    string_ids = {}
+
+    def intern(value):
+        if value not in string_ids:
+            string_ids[value] = len(strings)
+            strings.append(value)
+        return string_ids[value]
+
+    sections = list(sections)
+    columns = {}
+    for name, dtype in COLUMNS:
+        if name == 'mask':
+            words = [[(s.mask >> (64 * k)) & 0xFFFFFFFFFFFFFFFF for k in range(MASK_WORDS)] for s in sections]
+            columns[name] = np.array(words, dtype=dtype).reshape(len(sections), MASK_WORDS)
+        elif name == 'crn':
+            columns[name] = np.array([int(s.crn) for s in sections], dtype=dtype)
+        elif name == 'times':
+            columns[name] = np.array([intern('|'.join(s.times)) for s in sections], dtype=dtype)
+        elif name in STRING_COLUMNS:
+            columns[name] = np.array([intern(getattr(s, name)) for s in sections], dtype=dtype)
+        else:
+            columns[name] = np.array([getattr(s, name) for s in sections], dtype=dtype)
+
+    encoded = [value.encode() for value in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype='<u4')
+    offsets[1:] = np.cumsum([len(value) for value in encoded])
+    blob = b''.join(encoded)
+
+    # written to a file of its own next to path and moved over it, so processes compiling the catalog at
+    # the same time never write into each other's file and readers only ever see a whole one
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(path) or '.', prefix=os.path.basename(path) + '.', delete=False) as f:
+        try:
+            f.write(HEADER.pack(CATALOG_MAGIC, digest, len(sections), len(strings), len(blob)))
+            for name, _ in COLUMNS:
+                f.write(b'\0' * (_aligned(f.tell()) - f.tell()))
+                f.write(columns[name].tobytes())
+            f.write(b'\0' * (_aligned(f.tell()) - f.tell()))
+            f.write(offsets.tobytes())
+            f.write(blob)
+        except BaseException:
+            f.close()
+            os.remove(f.name)
+            raise
+    os.replace(f.name, path)
+
+
+class Catalog:
+    # read only view over a compiled catalog file, the columns are numpy arrays backed by the mmap
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.digest, count, string_count, blob_size = HEADER.unpack_from(self._mmap, 0)
+        if magic != CATALOG_MAGIC:
+            raise ValueError(f"{path} is not a compiled catalog")
+        self.count = count
+
+        offset = HEADER.size
+        self.columns = {}
+        for name, dtype in COLUMNS:
+            offset = _aligned(offset)
+            column = np.frombuffer(self._mmap, dtype=dtype, count=count * (MASK_WORDS if name == 'mask' else 1), offset=offset)
+            self.columns[name] = column.reshape(count, MASK_WORDS) if name == 'mask' else column
+            offset += _column_size(name, dtype, count)
+
+        offset = _aligned(offset)
+        offsets = np.frombuffer(self._mmap, dtype='<u4', count=string_count + 1, offset=offset)
+        blob = self._mmap[offset + offsets.nbytes:offset + offsets.nbytes + blob_size]
+        self.strings = [blob[offsets[i]:offsets[i + 1]].decode() for i in range(string_count)]
+
+    def __len__(self):
+        return self.count
+
+    def string_id(self, value):
+        # id in the string table, -1 when the catalog never uses the string
+        if not hasattr(self, '_string_ids'):
+            self._string_ids = {string: i for i, string in enumerate(self.strings)}
+        return self._string_ids.get(value, -1)
+
+    def section(self, i):
+        values = {}
+        for name, _ in COLUMNS:
+            value = self.columns[name][i]
+            if name == 'mask':
+                values[name] = sum(int(word) << (64 * k) for k, word in enumerate(value))
+            elif name == 'crn':
+                values[name] = str(int(value))
+            elif name == 'times':
+                times = self.strings[value]
+                values[name] = tuple(times.split('|')) if times else ()
+            elif name in STRING_COLUMNS:
+                values[name] = self.strings[value]
+            elif name in ('open_section', 'restricted'):
+                values[name] = bool(value)
+            elif name == 'credits':
+                values[name] = float(value)
+            else:
+                values[name] = int(value)
+        return BannerSection(**values)
+
+    def __iter__(self):
+        return (self.section(i) for i in range(self.count))
+
+
+def load_catalog(directory='courses_fall25', cache_path=None, workers=None):
+    # opens the compiled catalog, rebuilding it first when the Banner pages changed
+    paths = banner_pages(directory)
+    cache_path = cache_path or os.path.join(directory, 'catalog.bin')
+    digest = source_hash(paths)
+    if os.path.exists(cache_path):
+        try:
+            catalog = Catalog(cache_path)
+            if catalog.digest == digest:
+                return catalog
+        except (ValueError, struct.error):
+            pass
+    write_catalog(cache_path, iter_sections(paths, workers=workers), digest)
+    return Catalog(cache_path)
+
+
+def available_time_data(directory='courses_fall25', policy=SeatPolicy(), cache_path=None):
+    # time_data for build_model2 with only the sections the policy lets a student register for. only a
+    # library function for now: the servers' timetable routes schedule the hand typed time_data of
+    # scheduler_data, whose codes are the majors' codes, and not the Banner catalog
+    catalog = load_catalog(directory, cache_path=cache_path)
+    return build_time_data(filter_sections(catalog, policy))
@@ -0,0 +1,120 @@
+# gurobi environments for the schedulers, started once per worker and handed from one solve to the next
+# instead of every model going through the default environment, plus the solver logging. models are
+# quiet: with the 'scheduler.gurobi' logger at DEBUG the solver log goes to it line by line (through the
+# MESSAGE callback, never to stdout), and at INFO every solve logs one summary line. every solve also
+# goes into the solver metrics (metrics.py)
+import logging
+import threading
+from contextlib import contextmanager
+
+from metrics import MODEL_SIZE, SOLVER_GAP, SOLVER_NODES, SOLVER_SECONDS, SOLVES
+
+try:
+    import gurobipy as gp
+    from gurobipy import GRB
+except ImportError:
+    gp = None
+    GRB = None
+
+log = logging.getLogger('scheduler.gurobi')
+
+
+class EnvPool:
+    def __init__(self, params=None):
+        # params are set on every environment before it starts. an environment is used by one solve at a
+        # time (they aren't thread safe), so the pool grows to the most solves that ran at once
+        self.params = dict(params or {})
+        self.free = []
+        self.started = 0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        # None without gurobipy, the schedulers only search then
+        if gp is None:
+            return None
+        with self.lock:
+            if self.free:
+                return self.free.pop()
+            self.started += 1
+        env = gp.Env(empty=True)
+        env.setParam('OutputFlag', 0)
+        for name, value in self.params.items():
+            env.setParam(name, value)
+        env.start()
+        return env
+
+    def release(self, env):
+        with self.lock:
+            self.free.append(env)
+
+    @contextmanager
+    def env(self):
+        # with ENV_POOL.env() as env: a started environment for the block, the models made on it should
+        # be disposed (CourseScheduler.dispose) before it ends
+        env = self.acquire()
+        try:
+            yield env
+        finally:
+            self.release(env)
+
+    def close(self):
+        with self.lock:
+            envs, self.free = self.free, []
+        for env in envs:
+            env.dispose()
+
+
+# the pool of this process, so each worker (see jobs.py) has its own
+ENV_POOL = EnvPool()
+
+
+def optimize(model, callback=None, name=None):
+    # model.optimize(callback) with the log going to the logger, see the top. name labels the model in
+    # the metrics, the model's name by default
+    if log.isEnabledFor(logging.DEBUG):
+        model.setParam('OutputFlag', 1)
+        model.setParam('LogToConsole', 0)
+
+        def logged(model, where):
+            if where == GRB.Callback.MESSAGE:
+                line = model.cbGet(GRB.Callback.MSG_STRING).rstrip()
+                if line:
+                    log.debug(line)
+            if callback is not None:
+                callback(model, where)
+        model.optimize(logged)
+    elif callback is not None:
+        model.optimize(callback)
+    else:
+        model.optimize()
+    try:
+        observe(model, name or model.ModelName)
+    except Exception:
+        # the metrics never fail a solve
+        log.debug("no metrics for %s", name, exc_info=True)
+    if log.isEnabledFor(logging.INFO):
+        log.info("%s: status %s in %.3fs, objective %s, bound %s, %s nodes", model.ModelName, model.Status, model.Runtime,
+                 attribute(model, 'ObjVal'), attribute(model, 'ObjBound'), attribute(model, 'NodeCount'))
+
+
+def observe(model, name):
+    # size of the model and how the solve went
+    MODEL_SIZE.observe(model.NumVars, model=name, kind='vars')
+    MODEL_SIZE.observe(model.NumConstrs, model=name, kind='constraints')
+    MODEL_SIZE.observe(model.NumQNZs, model=name, kind='quadratic_terms')
+    SOLVER_SECONDS.observe(model.Runtime, model=name)
+    SOLVES.inc(model=name, status=model.Status)
+    nodes = attribute(model, 'NodeCount')
+    if nodes is not None:
+        SOLVER_NODES.observe(nodes, model=name)
+    gap = attribute(model, 'MIPGap') if model.SolCount else None
+    if gap is not None and gap != GRB.INFINITY:
+        SOLVER_GAP.observe(gap, model=name)
+
+
+def attribute(model, name):
+    # None when the model has no such value (no solution, not a MIP...)
+    try:
+        return model.getAttr(name)
+    except gp.GurobiError:
+        return None
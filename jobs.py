@@ -0,0 +1,194 @@
+# plan solves as background jobs, so a slow solve doesn't hold a request thread. submit gives back a
+# job id right away and a pool of worker processes runs the solves, each gurobi model limited to its
+# share of the cores (threads) so the solves running together don't fight over them. students with
+# equivalent histories (same major, starting semester and completed_signature) share one solve, which
+# is what makes a bulk submission of a whole class cheap. a job's result is
+# {'found': bool, 'gap': plan_gap, 'error': why there is no plan or None, 'plan': {course: semester}}.
+# the metrics a worker counts for a solve come back with it and go into this process's /metrics
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import metrics
+from gurobi_env import ENV_POOL
+from plan_cache import PlanCache
+from prerequisites import completed_signature, normalize_completed, parse_codes
+from scheduler import CourseScheduler
+from scheduler_data import plans
+
+NO_PLAN = "No plan was found for the remaining courses in time."
+
+_caches = {} # cache path -> PlanCache, one per worker process
+
+
+def plan_error(scheduler, min_horizon=None):
+    # why the scheduler's remaining courses can't be planned, None when the cheap checks pass
+    problems = scheduler.plan_problems(min_horizon)
+    if not problems:
+        return None
+    needed = scheduler.minimal_semesters()
+    if needed is not None:
+        problems.append(f"The remaining courses need at least {needed} more semesters.")
+    return ' '.join(problems)
+
+
+def solve_student(major, completed, starting, limits, options, time_limit=None, threads=None, cache_path=None):
+    # one plan request, run in a worker process. the templates (scheduler.plan_templates), the gurobi
+    # environment and the plan cache connection stay around in the worker for the next jobs
+    courses = plans[major]
+    scheduler = CourseScheduler(courses=courses, completed=completed, required=set(courses), starting=starting, pool=ENV_POOL, **limits)
+    error = plan_error(scheduler, options.get('min_horizon'))
+    if error is not None:
+        return {'found': False, 'gap': None, 'error': error, 'plan': {}}
+    cache = None
+    if cache_path is not None:
+        cache = _caches.get(cache_path) or _caches.setdefault(cache_path, PlanCache(cache_path))
+    try:
+        solved = scheduler.solve_plan(template=major, time_limit=time_limit, threads=threads, cache=cache, **options)
+    finally:
+        scheduler.dispose()
+    return {'found': solved is not None, 'gap': scheduler.plan_gap, 'error': None if solved is not None else NO_PLAN, 'plan': solved or {}}
+
+
+def run_job(*args):
+    # solve_student in a worker, with the metrics it counted since the last job
+    return solve_student(*args), metrics.drain()
+
+
+def read_students(data):
+    # the students of a POST body: one student, or {'students': [...]} for a bulk submission. completed
+    # is a list of codes or the comma separated string the forms send, both cleaned up like parse_codes.
+    # ValueError for anything missing or malformed
+    students = data.get('students', [data]) if isinstance(data, dict) else None
+    if not isinstance(students, list) or not students:
+        raise ValueError("expected a student or a non empty 'students' list")
+    read = []
+    for student in students:
+        try:
+            major = int(student['major'])
+            completed = student.get('completed', '')
+            if isinstance(completed, str):
+                completed = parse_codes(completed)
+            elif all(isinstance(code, str) for code in completed):
+                completed = set().union(*(parse_codes(code) for code in completed))
+            else:
+                raise TypeError
+            completed_semesters = int(student.get('completed_semesters', 0))
+        except (KeyError, TypeError, ValueError, AttributeError):
+            raise ValueError(f"bad student {student!r}, needs major, completed and completed_semesters")
+        if not 0 <= major < len(plans):
+            raise ValueError(f"unknown major {major}")
+        if completed_semesters < 0:
+            raise ValueError(f"completed_semesters can't be negative, got {completed_semesters}")
+        read.append({'major': major, 'completed': completed, 'completed_semesters': completed_semesters})
+    return read
+
+
+class Job:
+    def __init__(self, id, future, student):
+        self.id = id
+        self.future = future # shared with the other jobs of equivalent students, gives (result, metrics)
+        self.student = student
+        self.submitted = time.time()
+
+    @property
+    def status(self):
+        if self.future.done():
+            return 'failed' if self.future.exception() is not None else 'done'
+        return 'running' if self.future.running() else 'queued'
+
+    def result(self, timeout=None):
+        # the solve_student result, waiting for it up to timeout seconds
+        return self.future.result(timeout)[0]
+
+    def to_dict(self):
+        job = {'id': self.id, 'status': self.status, 'submitted': self.submitted}
+        if job['status'] == 'done':
+            job['result'] = self.result()
+        elif job['status'] == 'failed':
+            job['error'] = str(self.future.exception())
+        return job
+
+
+class JobQueue:
+    def __init__(self, workers=None, threads=None, limits=None, options=None, time_limit=None, cache_path=None, keep=10000):
+        # limits and options go to CourseScheduler and solve_plan for every job, keep is how many jobs
+        # are remembered for polling before the oldest finished ones are dropped
+        cores = os.cpu_count() or 1
+        self.workers = workers or cores
+        self.threads = threads or max(1, cores // self.workers)
+        self.limits = dict(limits or {})
+        self.options = dict(options or {})
+        self.time_limit = time_limit
+        self.cache_path = cache_path
+        self.keep = keep
+        self.jobs = OrderedDict() # id -> Job, oldest first
+        self.solves = {} # (major, completed signature, starting) -> future of the solve running for it
+        self.lock = threading.RLock()
+        self.executor = None
+
+    def pool(self):
+        # started on the first job so importing a server doesn't start processes. spawned rather than
+        # forked, a forked gurobi environment isn't safe to use in the child
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+        return self.executor
+
+    def submit(self, major, completed, completed_semesters):
+        # the id of a new job for the student, which joins the solve of an equivalent student if one is
+        # still running
+        courses = plans[major]
+        completed = normalize_completed(courses, completed)
+        starting = completed_semesters + 1
+        key = (major, completed_signature(courses, completed), starting)
+        with self.lock:
+            future = self.solves.get(key)
+            if future is None:
+                args = (run_job, major, completed, starting, self.limits, self.options, self.time_limit, self.threads, self.cache_path)
+                try:
+                    future = self.pool().submit(*args)
+                except BrokenProcessPool:
+                    # a worker died (gurobi crashing takes the process with it), the jobs it had failed
+                    # and the pool doesn't take more, so start a new one
+                    self.executor.shutdown(wait=False, cancel_futures=True)
+                    self.executor = None
+                    future = self.pool().submit(*args)
+                self.solves[key] = future
+                future.add_done_callback(lambda done: self.finished(key, done))
+            job = Job(uuid.uuid4().hex, future, {'major': major, 'completed': list(completed), 'completed_semesters': completed_semesters})
+            self.jobs[job.id] = job
+            self.trim()
+        return job.id
+
+    def submit_many(self, students):
+        # ids for students from read_students, in the same order
+        return [self.submit(s['major'], s['completed'], s['completed_semesters']) for s in students]
+
+    def finished(self, key, future):
+        # later equivalent students get the plan from the cache, not from this solve
+        with self.lock:
+            if self.solves.get(key) is future:
+                del self.solves[key]
+        if not future.cancelled() and future.exception() is None:
+            metrics.merge(future.result()[1])
+
+    def trim(self):
+        while len(self.jobs) > self.keep:
+            oldest = next(iter(self.jobs.values()))
+            if not oldest.future.done():
+                break
+            del self.jobs[oldest.id]
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
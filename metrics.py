@@ -0,0 +1,194 @@
+# counters and histograms of where the time of a request goes (model building phases, the solver, the
+# caches, template rendering), rendered in the Prometheus text format for the servers' /metrics. they
+# are per process: a job worker (jobs.py) sends what it counted back with each result (drain) and the
+# server adds it to its own (merge)
+import math
+import threading
+import time
+
+TIME_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SIZE_BUCKETS = (10, 30, 100, 300, 1000, 3000, 10000, 30000, 100000)
+GAP_BUCKETS = (0, 1e-4, 1e-3, 0.01, 0.05, 0.1, 0.25, 0.5, 1)
+
+_metrics = [] # everything render() shows, in the order it was made
+
+
+def _labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join('{}="{}"'.format(name, str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n'))
+                     for name, value in zip(names, values))
+    return '{' + pairs + '}'
+
+
+def _number(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values = {} # label values -> count
+        self.lock = threading.Lock()
+        _metrics.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels[name] for name in self.labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self.values.get(tuple(labels[name] for name in self.labels), 0)
+
+    def drain(self):
+        with self.lock:
+            values, self.values = self.values, {}
+        return values
+
+    def merge(self, values):
+        with self.lock:
+            for key, value in values.items():
+                self.values[key] = self.values.get(key, 0) + value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            for key, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{_labels(self.labels, key)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=TIME_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets) + (math.inf,)
+        self.values = {} # label values -> [count per bucket (not cumulative), sum, count]
+        self.lock = threading.Lock()
+        _metrics.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(labels[name] for name in self.labels)
+        with self.lock:
+            counts = self.values.get(key)
+            if counts is None:
+                counts = self.values[key] = [[0] * len(self.buckets), 0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[0][i] += 1
+                    break
+            counts[1] += value
+            counts[2] += 1
+
+    def count(self, **labels):
+        counts = self.values.get(tuple(labels[name] for name in self.labels))
+        return counts[2] if counts else 0
+
+    def drain(self):
+        with self.lock:
+            values, self.values = self.values, {}
+        return values
+
+    def merge(self, values):
+        with self.lock:
+            for key, (buckets, total, count) in values.items():
+                counts = self.values.get(key)
+                if counts is None:
+                    counts = self.values[key] = [[0] * len(self.buckets), 0, 0]
+                counts[0] = [mine + theirs for mine, theirs in zip(counts[0], buckets)]
+                counts[1] += total
+                counts[2] += count
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            for key, (counts, total, count) in sorted(self.values.items()):
+                cumulative = 0
+                for bound, n in zip(self.buckets, counts):
+                    cumulative += n
+                    lines.append(f"{self.name}_bucket{_labels(self.labels + ('le',), key + (_number(bound),))} {cumulative}")
+                lines.append(f"{self.name}_sum{_labels(self.labels, key)} {_number(total)}")
+                lines.append(f"{self.name}_count{_labels(self.labels, key)} {count}")
+        return lines
+
+
+class Phases:
+    # times the phases of building a model one after the other: mark(phase) records the time since the
+    # last mark (or since it was made) under that phase
+    def __init__(self, model):
+        self.model = model
+        self.last = time.perf_counter()
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        PHASE_SECONDS.observe(now - self.last, model=self.model, phase=phase)
+        self.last = now
+
+
+def instrument(app):
+    # request and template timings for a flask app, and its /metrics. a streamed response (the SSE
+    # endpoints) is timed until it starts streaming
+    from flask import Response, before_render_template, g, request, template_rendered
+
+    @app.before_request
+    def start_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def stop_timer(response):
+        started = g.pop('metrics_started', None)
+        if started is not None:
+            REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=request.endpoint or 'none')
+        return response
+
+    def start_render(sender, template, context, **extra):
+        g.metrics_rendering = time.perf_counter()
+
+    def stop_render(sender, template, context, **extra):
+        started = g.pop('metrics_rendering', None)
+        if started is not None:
+            RENDER_SECONDS.observe(time.perf_counter() - started, template=template.name)
+
+    before_render_template.connect(start_render, app)
+    template_rendered.connect(stop_render, app)
+
+    @app.route('/metrics')
+    def metrics():
+        return Response(render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+
+def drain():
+    # everything counted since the last drain, {metric name: values}, and counting starts again from 0
+    return {metric.name: metric.drain() for metric in _metrics}
+
+
+def merge(drained):
+    # adds what drain() gave in another process
+    by_name = {metric.name: metric for metric in _metrics}
+    for name, values in drained.items():
+        if name in by_name:
+            by_name[name].merge(values)
+
+
+def render():
+    # every metric in the Prometheus text format (version 0.0.4)
+    lines = []
+    for metric in _metrics:
+        lines += metric.render()
+    return '\n'.join(lines) + '\n'
+
+
+PHASE_SECONDS = Histogram('scheduler_phase_seconds', 'Time spent in each phase of building and solving a model.', ['model', 'phase'])
+MODEL_SIZE = Histogram('scheduler_model_size', 'Variables, constraints and quadratic terms of the models solved.', ['model', 'kind'], SIZE_BUCKETS)
+SOLVER_SECONDS = Histogram('scheduler_solver_seconds', 'Gurobi runtime of each optimize call.', ['model'])
+SOLVER_NODES = Histogram('scheduler_solver_nodes', 'Branch and bound nodes explored by each optimize call.', ['model'], (0, 1, 10, 100, 1000, 10000, 100000))
+SOLVER_GAP = Histogram('scheduler_solver_gap', 'Relative MIP gap when optimize returns with a solution.', ['model'], GAP_BUCKETS)
+SOLVES = Counter('scheduler_solves_total', 'Optimize calls by model and gurobi status code.', ['model', 'status'])
+CACHE_REQUESTS = Counter('scheduler_cache_requests_total', 'Lookups in the plan cache, the plan templates and the /api ETags.', ['cache', 'result'])
+REQUEST_SECONDS = Histogram('server_request_seconds', 'Time to answer a request, by endpoint.', ['endpoint'])
+RENDER_SECONDS = Histogram('server_render_seconds', 'Time spent rendering each template.', ['template'])
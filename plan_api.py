@@ -0,0 +1,315 @@
+# the routes both servers have (/api/plan, /api/timetable, the job events, /plan/stream and
+# /next_semester/options) as one blueprint, plus the plan settings, the plan cache and the job queue the
+# servers share and the helpers their pages use. register it with app.register_blueprint(plan_api)
+import json
+import logging
+import os
+import queue
+import threading
+from concurrent.futures import wait
+
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+
+from gurobi_env import ENV_POOL
+from jobs import NO_PLAN, JobQueue, plan_error, read_students
+from metrics import CACHE_REQUESTS
+from plan_cache import PlanCache, catalog_version, plan_key
+from prerequisites import completed_signature, normalize_completed
+from scheduler import CourseScheduler
+from scheduler_data import plans, time_data
+
+# plans over 12 semesters, or into the fifth year when the remaining courses can't fit in 12
+PLAN_OPTIONS = dict(alpha=0, beta=0, gamma=80, delta=30, windows=True, min_horizon=12, warm_start=True)
+PLAN_TIME_LIMIT = 10 # seconds a plan request can keep the solver busy
+# versions of the course data for the /api ETags
+CATALOG_VERSIONS = [catalog_version(courses) for courses in plans]
+TIME_DATA_VERSION = catalog_version(time_data)
+# the plan cache's sqlite file, app.config['PLAN_CACHE_PATH'] wins over it (None keeps it in memory)
+PLAN_CACHE_PATH = os.environ.get('PLAN_CACHE_PATH', 'plan_cache.db')
+
+plan_api = Blueprint('plan_api', __name__)
+
+log = logging.getLogger('scheduler.plan_api')
+setup_lock = threading.Lock() # for making the app's plan cache and job queue once
+
+
+def plan_cache_path():
+    return current_app.config.get('PLAN_CACHE_PATH', PLAN_CACHE_PATH)
+
+
+def get_plan_cache():
+    # the app's cache of optimal plans by their inputs, opened on first use (not when a server is imported)
+    # and then whatever was cached for older versions of the majors is dropped
+    state = current_app.extensions.setdefault('plan_api', {})
+    with setup_lock:
+        if 'plan_cache' not in state:
+            cache = PlanCache(plan_cache_path())
+            cache.prune(CATALOG_VERSIONS)
+            state['plan_cache'] = cache
+    return state['plan_cache']
+
+
+def get_jobs():
+    # the app's queue of plan solves in worker processes for /api/jobs (see jobs.py), made on first use.
+    # the workers share the app's plan cache file
+    state = current_app.extensions.setdefault('plan_api', {})
+    with setup_lock:
+        if 'jobs' not in state:
+            state['jobs'] = JobQueue(limits=dict(max=180, min=12, semesters=15), options=PLAN_OPTIONS, time_limit=PLAN_TIME_LIMIT,
+                                     cache_path=plan_cache_path())
+    return state['jobs']
+
+
+@plan_api.route('/api/jobs/<job_id>/events')
+def job_events(job_id):
+    # server-sent events: 'status' whenever the job's status changes, then 'done' with the whole job
+    job = get_jobs().get(job_id)
+    if job is None:
+        return jsonify({'error': 'job not found'}), 404
+
+    def generate():
+        status = None
+        while not job.future.done():
+            if job.status != status:
+                status = job.status
+                yield f"event: status\ndata: {json.dumps({'id': job.id, 'status': status})}\n\n"
+            wait([job.future], timeout=0.5)
+        yield f"event: done\ndata: {json.dumps(job.to_dict())}\n\n"
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream')
+
+
+@plan_api.route('/api/plan', methods=['GET', 'POST'])
+def api_plan():
+    # the plan as JSON. the ETag is a hash of the canonical inputs and the major's catalog version, so a
+    # client sending it back in If-None-Match gets a 304 without anything being solved
+    try:
+        student = read_students(request.values.to_dict())[0]
+    except ValueError as error:
+        return jsonify({'error': str(error)}), 400
+    major = student['major']
+    courses = plans[major]
+    completed = normalize_completed(courses, student['completed'])
+    starting = student['completed_semesters'] + 1
+    etag = plan_key(CATALOG_VERSIONS[major], completed=completed_signature(courses, completed), starting=starting, options=PLAN_OPTIONS)
+    if etag_matches(etag):
+        return not_modified(etag)
+
+    scheduler = CourseScheduler(courses=courses, completed=completed, required=set(courses), max=180, min=12, semesters=15, starting=starting, pool=ENV_POOL)
+    try:
+        error = plan_error(scheduler, PLAN_OPTIONS['min_horizon'])
+        solved = None
+        if error is None:
+            solved = scheduler.solve_plan(template=major, time_limit=PLAN_TIME_LIMIT, cache=get_plan_cache(), **PLAN_OPTIONS)
+            if solved is None:
+                error = NO_PLAN
+    finally:
+        scheduler.dispose()
+    response = jsonify({'major': major, 'starting': starting, 'found': solved is not None, 'gap': scheduler.plan_gap,
+                        'error': error, 'plan': solved or {}})
+    # a plan (or no plan) cut short by the time limit can come out differently next time, so no ETag
+    if (solved is None and error != NO_PLAN) or (scheduler.plan_gap is not None and scheduler.plan_gap <= 1e-4):
+        response.set_etag(etag)
+    return response
+
+
+@plan_api.route('/api/timetable', methods=['GET', 'POST'])
+def api_timetable():
+    # the next semester's timetable as JSON, with an ETag from the inputs like /api/plan
+    try:
+        student = read_students(request.values.to_dict())[0]
+    except ValueError as error:
+        return jsonify({'error': str(error)}), 400
+    major = student['major']
+    courses = plans[major]
+    # codes outside the major don't change what's left to take
+    completed = student['completed'] & set(courses)
+    etag = plan_key(TIME_DATA_VERSION, major=CATALOG_VERSIONS[major], completed=completed)
+    if etag_matches(etag):
+        return not_modified(etag)
+
+    scheduler = CourseScheduler(courses=time_data, completed=completed, required=set(courses), pool=ENV_POOL)
+    try:
+        chosen = scheduler.solve_timetable(list(time_data))
+    finally:
+        scheduler.dispose()
+    timetable = []
+    for course, section in sorted(chosen or []):
+        entry, is_lab = scheduler.section_index(course)[section]
+        time = entry.get('time', '') if isinstance(entry, dict) else entry
+        timetable.append({'code': course, 'section': section, 'time': time, 'lab': is_lab})
+    response = jsonify({'major': major, 'found': chosen is not None, 'timetable': timetable})
+    response.set_etag(etag)
+    return response
+
+
+@plan_api.route('/next_semester/options', methods=['POST'])
+def next_semester_options():
+    # the k best timetables from a single search, streamed best first as one JSON object per line
+    try:
+        student = read_students(request.form.to_dict())[0]
+    except ValueError as error:
+        return jsonify({'error': str(error)}), 400
+    # k sets the size of gurobi's solution pool and of the search's heap, so it's kept small
+    try:
+        k = max(1, min(int(request.form.get('k', 5)), 20))
+    except ValueError:
+        return jsonify({'error': 'k has to be a whole number of timetables'}), 400
+    courses = plans[student['major']]
+
+    scheduler = CourseScheduler(
+        courses=time_data,
+        completed=student['completed'],
+        required=set(courses.keys()),
+        pool=ENV_POOL
+    )
+    try:
+        desired_courses = list(time_data.keys())
+        options = scheduler.solve_timetables(desired_courses, k=k)
+    finally:
+        scheduler.dispose()
+
+    def generate():
+        for rank, ((days, span), chosen) in enumerate(options, start=1):
+            yield json.dumps({
+                'rank': rank,
+                'days': days,
+                'hours_on_campus': span / 4,
+                'timetable': timetable_entries(scheduler, chosen),
+            }) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+@plan_api.route('/plan/stream', methods=['POST'])
+def plan_stream():
+    # server-sent events: an 'incumbent' event with every better plan the solver finds, so there is
+    # something to show right away, then 'done' with the final plan once it is optimal or out of time
+    try:
+        student = read_students(request.form.to_dict())[0]
+    except ValueError as error:
+        return jsonify({'error': str(error)}), 400
+    try:
+        time_limit = min(float(request.form.get('time_limit', PLAN_TIME_LIMIT)), PLAN_TIME_LIMIT)
+        if not time_limit > 0: # nan isn't either
+            raise ValueError
+    except ValueError:
+        return jsonify({'error': 'time_limit has to be a positive number of seconds'}), 400
+    major_index = student['major']
+    courses = plans[major_index]
+    completed_set = set(normalize_completed(courses, student['completed']))
+
+    scheduler = CourseScheduler(
+        courses=courses,
+        completed=completed_set,
+        required=set(courses.keys()),
+        max=180,
+        min=12,
+        semesters=15,
+        starting=student['completed_semesters'] + 1,
+        pool=ENV_POOL
+    )
+    events = queue.Queue()
+    cache = get_plan_cache() # (solve runs outside the app context)
+
+    def incumbent(solved, objective, gap):
+        events.put(('incumbent', {'objective': objective, 'gap': gap, 'plan': plan_semesters(courses, solved)}))
+
+    def solve():
+        # runs next to the response so the events go out while gurobi is still working
+        solved = None
+        error = None
+        try:
+            error = plan_error(scheduler, PLAN_OPTIONS['min_horizon'])
+            if error is None:
+                try:
+                    solved = scheduler.solve_plan(template=major_index, time_limit=time_limit, on_incumbent=incumbent, cache=cache, **PLAN_OPTIONS)
+                finally:
+                    scheduler.dispose()
+        except Exception:
+            # the stream still ends with 'done', there is no request left to fail
+            log.exception("plan stream for major %s failed", major_index)
+            error = "The plan couldn't be solved, try again."
+        finally:
+            events.put(('done', {'found': solved is not None, 'gap': scheduler.plan_gap, 'error': error,
+                                 'plan': plan_semesters(courses, solved or {})}))
+
+    def generate():
+        threading.Thread(target=solve, daemon=True).start()
+        while True:
+            event, data = events.get()
+            yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+            if event == 'done':
+                break
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream')
+
+
+def plan_semesters(courses, solved):
+    # Transform plan to structured format for frontend
+    result_dict = {}
+    for course, sem in solved.items():
+        result_dict.setdefault(sem, []).append(course)
+    plan = []
+    for sem, course_codes in sorted(result_dict.items()):
+        semester_courses = []
+        for code in course_codes:
+            course_info = courses.get(code, {})
+            semester_courses.append({
+                "code": code,
+                "name": course_info.get("name", code),
+                "credits": course_info.get("credits", 0)
+            })
+        plan.append({
+            "number": sem,
+            "credits": sum(c["credits"] for c in semester_courses),
+            "courses": semester_courses
+        })
+    return plan
+
+
+def timetable_entries(scheduler, chosen):
+    # Gather schedule info for visualization
+    timetable_courses = []
+    # Assign a color per course for timetable
+    color_palette = ['#3182ce', '#38a169', '#e53e3e', '#d69e2e', '#805ad5', '#319795', '#f56565', '#ed8936', '#ecc94b', '#48bb78', '#4299e1', '#9f7aea']
+    course_colors = {}
+    for idx, course in enumerate(scheduler.courses.keys()):
+        course_colors[course] = color_palette[idx % len(color_palette)]
+
+    for course, section in chosen:
+        cinfo = scheduler.courses[course]
+        # Find the section info (a lecture or a lab)
+        entry, is_lab = scheduler.section_index(course)[section]
+        secinfo = entry if isinstance(entry, dict) else {'name': entry}
+        raw_time = secinfo.get('time')
+        if not raw_time:
+            raw_time = secinfo.get('name', '')
+        days, start, end = CourseScheduler.parse_time(raw_time) if raw_time else ([], '', '')
+        timetable_courses.append({
+            'code': course,
+            'name': cinfo.get('name', course),
+            'section': section,
+            'days': days,  
+            'start': start,  
+            'end': end,      
+            'room': secinfo.get('room', ''),
+            'color': course_colors[course],
+            'raw_time': raw_time,
+            # length in minutes, using to_minutes
+            'length': CourseScheduler.to_minutes(end) - CourseScheduler.to_minutes(start) if raw_time else 0,
+        })
+    return timetable_courses
+
+
+def etag_matches(etag):
+    # whether the client already has this response, counted with the other caches for /metrics
+    matches = etag in request.if_none_match
+    CACHE_REQUESTS.inc(cache='etag', result='hit' if matches else 'miss')
+    return matches
+
+
+def not_modified(etag):
+    response = Response(status=304)
+    response.set_etag(etag)
+    return response
@@ -0,0 +1,103 @@
+# solved plans, so the same request isn't solved again (see CourseScheduler.solve_plan). the key is a
+# hash of everything the plan depends on, including a version of the course data itself, so changing a
+# plan in scheduler_data makes its old entries miss. the most recent plans are kept in memory and
+# all of them in a sqlite table that outlives the process
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+
+from metrics import CACHE_REQUESTS
+
+log = logging.getLogger('scheduler.plan_cache')
+
+
+def catalog_version(courses):
+    # hash of the course data, anything that changes a plan (prereqs, credits, importance...) changes it.
+    # course records hash like the dicts they were made from
+    return hashlib.sha256(json.dumps(courses, sort_keys=True, default=_plain).encode()).hexdigest()
+
+
+def _plain(value):
+    return dict(value) if isinstance(value, Mapping) else sorted(value)
+
+
+def plan_key(version, **inputs):
+    # the same inputs give the same key whatever order the course sets and options come in
+    canonical = {name: sorted(value) if isinstance(value, (set, frozenset, list, tuple)) else value for name, value in inputs.items()}
+    return hashlib.sha256(json.dumps([version, canonical], sort_keys=True).encode()).hexdigest()
+
+
+class PlanCache:
+    def __init__(self, path=None, size=256, timeout=30):
+        # path is the sqlite file, None to only keep the size most recent plans in memory. the file is
+        # shared by the servers and the job workers (jobs.py), so it's in WAL mode (reads don't wait for
+        # writes) and a write waits up to timeout seconds for the others
+        self.size = size
+        self.memory = OrderedDict() # key -> (version, plan)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.db = None
+        if path is not None:
+            self.db = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("CREATE TABLE IF NOT EXISTS plans (key TEXT PRIMARY KEY, version TEXT NOT NULL, plan TEXT NOT NULL)")
+            self.db.commit()
+
+    def get(self, key):
+        # the plan as {course: semester}, or None when it isn't cached
+        with self.lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                self.hits += 1
+                CACHE_REQUESTS.inc(cache='plan', result='hit')
+                return dict(self.memory[key][1])
+            row = self.db.execute("SELECT version, plan FROM plans WHERE key = ?", (key,)).fetchone() if self.db else None
+            if row is None:
+                self.misses += 1
+                CACHE_REQUESTS.inc(cache='plan', result='miss')
+                return None
+            plan = {course: sem for course, sem in json.loads(row[1])}
+            self.remember(key, row[0], plan)
+            self.hits += 1
+            CACHE_REQUESTS.inc(cache='plan', result='disk_hit')
+            return dict(plan)
+
+    def put(self, key, version, plan):
+        with self.lock:
+            self.remember(key, version, dict(plan))
+            if self.db:
+                # the plan is solved already, a write that still finds the file locked only loses the copy on disk
+                try:
+                    self.db.execute("INSERT OR REPLACE INTO plans VALUES (?, ?, ?)", (key, version, json.dumps(sorted(plan.items()))))
+                    self.db.commit()
+                except sqlite3.OperationalError as error:
+                    self.db.rollback()
+                    log.warning("plan %s not written to the cache file: %s", key, error)
+
+    def remember(self, key, version, plan):
+        self.memory[key] = (version, plan)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.size:
+            self.memory.popitem(last=False)
+
+    def prune(self, versions):
+        # drop everything cached for course data that isn't one of versions anymore
+        versions = set(versions)
+        with self.lock:
+            for key in [key for key, (version, _) in self.memory.items() if version not in versions]:
+                del self.memory[key]
+            if self.db:
+                marks = ','.join('?' * len(versions))
+                self.db.execute(f"DELETE FROM plans WHERE version NOT IN ({marks})", sorted(versions))
+                self.db.commit()
+
+    def __len__(self):
+        with self.lock:
+            if self.db:
+                return self.db.execute("SELECT COUNT(*) FROM plans").fetchone()[0]
+            return len(self.memory)
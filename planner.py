@@ -0,0 +1,101 @@
+# exact full plan search without a solver, used by CourseScheduler.solve_plan
+# the plan is given as
+#   semesters: [(semester, min load, max load)] in order
+#   costs: {course: {semester: cost}} with only the semesters the course can go in
+#   credits: {course: credits}, prereqs: {course: [prereqs that are also in costs]}
+#   needs: {course: credits needed before it}, done: credits already completed
+#   alone: courses that have to be alone in their semester (internships)
+from timetable import SearchTooLarge
+
+INF = float('inf')
+
+
+def search_plan(semesters, costs, credits, prereqs, needs=None, done=0, alone=(), max_nodes=100000, on_plan=None):
+    # branch and bound over the semesters in order, picking a set of the ready courses in each one (prereqs
+    # taken before, enough credits before, and the semester in its window) within the load limits.
+    # the bound is the cost so far plus the cheapest semester left for every course not placed yet, and a
+    # state (semester, courses taken) reached again for no less than before is cut too.
+    # returns (cost, {course: semester}) for the cheapest plan, or None if there is no plan.
+    # on_plan(cost, plan, bound) is called with every better plan found on the way, bound is a lower
+    # bound on the cost of any plan
+    needs = needs or {}
+    courses = sorted(costs)
+    n = len(courses)
+    full = (1 << n) - 1
+    prereq_mask = []
+    for course in courses:
+        mask = 0
+        for prereq in prereqs.get(course, ()):
+            if prereq in costs:
+                mask |= 1 << courses.index(prereq)
+        prereq_mask.append(mask)
+    size = [credits[c] for c in courses]
+    # cheapest[i][k]: the cheapest cost of course i in semester k or after it
+    cheapest = []
+    for course in courses:
+        row = [INF] * (len(semesters) + 1)
+        for k in range(len(semesters) - 1, -1, -1):
+            row[k] = min(row[k + 1], costs[course].get(semesters[k][0], INF))
+        cheapest.append(row)
+
+    root_bound = sum(row[0] for row in cheapest)
+    best = [INF, None]
+    seen = {}
+    nodes = [0]
+    picked = []
+
+    def search(k, taken, have, cost):
+        nodes[0] += 1
+        if nodes[0] > max_nodes:
+            raise SearchTooLarge(f"more than {max_nodes} nodes")
+        if taken == full:
+            # the semesters left can't have a min load
+            if cost < best[0] and all(lo == 0 for s, lo, hi in semesters[k:]):
+                best[0] = cost
+                best[1] = {courses[i]: s for i, s in picked}
+                if on_plan is not None:
+                    on_plan(cost, dict(best[1]), root_bound)
+            return
+        if k == len(semesters) or seen.get((k, taken), INF) <= cost:
+            return
+        seen[k, taken] = cost
+        bound = cost + sum(cheapest[i][k] for i in range(n) if not taken >> i & 1)
+        if bound >= best[0]:
+            return
+
+        s, lo, hi = semesters[k]
+        ready = [i for i in range(n) if not taken >> i & 1 and s in costs[courses[i]]
+                 and taken & prereq_mask[i] == prereq_mask[i] and have >= needs.get(courses[i], 0)]
+        # the ones that lose the most by waiting first, so good plans are found early
+        ready.sort(key=lambda i: costs[courses[i]][s] - cheapest[i][k + 1])
+        together = [i for i in ready if courses[i] not in alone]
+        left = [0] * (len(together) + 1)
+        for j in range(len(together) - 1, -1, -1):
+            left[j] = left[j + 1] + size[together[j]]
+
+        # the bound goes up by the extra cost of each course put here, or of moving it to a later semester
+        def pick(j, load, chosen, chosen_cost, bound):
+            if bound >= best[0] or load + left[j] < lo:
+                return
+            if j == len(together):
+                search(k + 1, taken | chosen, have + load, cost + chosen_cost)
+                return
+            i = together[j]
+            here = costs[courses[i]][s]
+            if load + size[i] <= hi:
+                picked.append((i, s))
+                pick(j + 1, load + size[i], chosen | 1 << i, chosen_cost + here, bound + here - cheapest[i][k])
+                picked.pop()
+            pick(j + 1, load, chosen, chosen_cost, bound + cheapest[i][k + 1] - cheapest[i][k])
+
+        for i in ready:
+            if courses[i] in alone and lo <= size[i] <= hi:
+                picked.append((i, s))
+                search(k + 1, taken | 1 << i, have + size[i], cost + costs[courses[i]][s])
+                picked.pop()
+        pick(0, 0, 0, 0, bound)
+
+    search(0, 0, done, 0)
+    if best[1] is None:
+        return None
+    return best[0], best[1]
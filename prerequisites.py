@@ -0,0 +1,100 @@
+# the prerequisite graph of a major: completed courses the way students type them turned into one
+# canonical set, so students with equivalent histories share cached plans and solves, and the courses
+# that need each course (transitive closure as bitsets) compiled once per graph
+import re
+from plan_cache import catalog_version
+
+# prerequisite graph version -> (sorted codes, {course: dependents bitset}, {course: importance})
+_closures = {}
+
+
+def parse_codes(raw):
+    # 'cosc 101, MATH111,,' -> {'COSC101', 'MATH111'}
+    return {re.sub(r'\s+', '', code).upper() for code in raw.split(',') if code.strip()}
+
+
+def normalize_completed(courses, completed):
+    # the completed courses that are in the catalog plus every prerequisite they imply (having passed a
+    # course means its prereqs were done too), sorted
+    done = set()
+    stack = [code for code in completed if code in courses]
+    while stack:
+        course = stack.pop()
+        if course in done:
+            continue
+        done.add(course)
+        stack.extend(prereq for prereq in courses[course]['prerequisites'] if prereq in courses)
+    return tuple(sorted(done))
+
+
+def completed_signature(courses, completed):
+    # the completed courses in the catalog as a hex bitset over the sorted course codes, equal sets give
+    # equal signatures for the same catalog
+    bits = 0
+    for i, code in enumerate(sorted(courses)):
+        if code in completed:
+            bits |= 1 << i
+    return format(bits, 'x')
+
+
+def topological_order(graph):
+    # the courses of {course: [prereqs]} with every prereq before the courses that need it,
+    # ValueError when some prereqs go round in a cycle
+    needed_by = {course: [] for course in graph}
+    waiting = {}
+    for course, prereqs in graph.items():
+        waiting[course] = len(set(prereqs))
+        for prereq in set(prereqs):
+            needed_by[prereq].append(course)
+    ready = sorted((course for course, count in waiting.items() if count == 0), reverse=True)
+    order = []
+    while ready:
+        course = ready.pop()
+        order.append(course)
+        for dependent in needed_by[course]:
+            waiting[dependent] -= 1
+            if waiting[dependent] == 0:
+                ready.append(dependent)
+    if len(order) < len(graph):
+        raise ValueError(f"prerequisite cycle among {sorted(set(graph) - set(order))}")
+    return order
+
+
+def dependents_closure(courses):
+    # (codes, {course: bitset of every course that needs it directly or through other courses}, {course:
+    # importance}) where bit i is codes[i]. one pass backwards over a topological order, since everything
+    # that needs a course comes after it, and cached per prerequisite graph so it survives edits that
+    # don't touch the prereqs (like the importance itself)
+    graph = {course: list(info['prerequisites']) for course, info in courses.items()}
+    for prereqs in list(graph.values()):
+        for prereq in prereqs:
+            graph.setdefault(prereq, [])
+    version = catalog_version(graph)
+    if version not in _closures:
+        codes = sorted(graph)
+        bit = {course: 1 << i for i, course in enumerate(codes)}
+        needed_by = {course: set() for course in graph}
+        for course, prereqs in graph.items():
+            for prereq in prereqs:
+                needed_by[prereq].add(course)
+        closure = {}
+        for course in reversed(topological_order(graph)):
+            bits = 0
+            for dependent in needed_by[course]:
+                bits |= bit[dependent] | closure[dependent]
+            closure[course] = bits
+        importance = {course: bin(closure[course]).count('1') + 1 for course in courses}
+        _closures[version] = (codes, closure, importance)
+    return _closures[version]
+
+
+def all_dependents(courses, course):
+    # every course that needs course, directly or not
+    codes, closure, _ = dependents_closure(courses)
+    bits = closure.get(course, 0)
+    return {code for i, code in enumerate(codes) if bits >> i & 1}
+
+
+def course_importance(courses):
+    # {course: 1 + how many courses need it}
+    return dict(dependents_closure(courses)[2])
@@ -0,0 +1,117 @@
+# every course stored once as a compact immutable record shared by all the majors (see scheduler_data).
+# a record reads like the course dicts it replaces (record['credits'], record.get('weight', 1),
+# 'min_credits' in record) so nothing that takes course dicts has to change, and the hot loops in the
+# scheduler read the attributes instead. a major is a plain dict {code: record}, the fields it changes
+# go in an overlay, and equal courses end up as the same record object whichever major they come from.
+# every code also gets a dense integer id, the same in all the majors
+from collections.abc import Mapping
+
+FIELDS = ('name', 'credits', 'prerequisites', 'weight', 'year', 'min_credits', 'available_in', 'sections', 'labs', 'importance')
+
+
+def freeze(name, value):
+    # lists become tuples and available_in a frozenset, json (catalog_version) sees the same values as before
+    if name == 'available_in' and value is not None:
+        return frozenset(value)
+    if isinstance(value, list):
+        return tuple(value)
+    return value
+
+
+class CourseRecord(Mapping):
+    # fields a course doesn't set are None and aren't keys
+    __slots__ = ('id', 'code') + FIELDS
+
+    def __init__(self, id, code, *values):
+        set_field = object.__setattr__
+        set_field(self, 'id', id)
+        set_field(self, 'code', code)
+        for name, value in zip(FIELDS, values):
+            set_field(self, name, value)
+
+    def __getitem__(self, name):
+        value = getattr(self, name) if name in FIELDS else None
+        if value is None:
+            raise KeyError(name)
+        return value
+
+    # get and in are the usual Mapping ones, just without going through __getitem__ and KeyError
+    def get(self, name, default=None):
+        value = getattr(self, name) if name in FIELDS else None
+        return default if value is None else value
+
+    def __contains__(self, name):
+        return name in FIELDS and getattr(self, name) is not None
+
+    def __iter__(self):
+        return (name for name in FIELDS if getattr(self, name) is not None)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{self.code} is a shared course record, make a changed one with REGISTRY.record")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{self.code} is a shared course record")
+
+    # records never change so copies can be the record itself, and a pickled one (for a worker process)
+    # comes back with the same id
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return CourseRecord, (self.id, self.code) + tuple(getattr(self, name) for name in FIELDS)
+
+    def __repr__(self):
+        return f"CourseRecord({self.code!r}, {dict(self)!r})"
+
+
+class CourseRegistry:
+    def __init__(self):
+        self.ids = {} # code -> dense id, in the order the codes were first seen
+        self.codes = [] # id -> code
+        self.interned = {} # (code, field values) -> record
+
+    def record(self, code, fields):
+        # the record for a course dict, the existing one when an equal course was made before. courses
+        # with unhashable fields (section dicts from a Banner catalog) just get a new record, so
+        # catalog.build_time_data makes those once
+        unknown = set(fields) - set(FIELDS)
+        if unknown:
+            raise ValueError(f"{code} has unknown course fields {sorted(unknown)}")
+        values = tuple(freeze(name, fields.get(name)) for name in FIELDS)
+        key = (code, values)
+        try:
+            record = self.interned.get(key)
+        except TypeError:
+            key = record = None
+        if record is None:
+            if code not in self.ids:
+                self.ids[code] = len(self.codes)
+                self.codes.append(code)
+            record = CourseRecord(self.ids[code], code, *values)
+            if key is not None:
+                self.interned[key] = record
+        return record
+
+    def major(self, courses, overlay=None):
+        # {code: record} for a major's course dicts (or records), with overlay {code: {field: value}}
+        # changing or adding what differs from them
+        overlay = overlay or {}
+        major = {}
+        for code in list(courses) + [code for code in overlay if code not in courses]:
+            major[code] = self.record(code, {**courses.get(code, {}), **overlay.get(code, {})})
+        return major
+
+    def records(self, courses):
+        # courses as records, as they are when they already are
+        if all(isinstance(info, CourseRecord) for info in courses.values()):
+            return courses
+        return self.major(courses)
+
+
+REGISTRY = CourseRegistry()
@@ -1,10 +1,33 @@
-import gurobipy as gp
-from gurobipy import GRB
+try:
+    import gurobipy as gp
+    from gurobipy import GRB
+except ImportError: # the built in searches (backend='search') work without gurobi
+    gp = None
+    GRB = None
 from unittest.mock import MagicMock
+from functools import lru_cache
+import logging
+import numpy as np
+import threading
+import time
+import scipy.sparse as sp
+from timetable import SearchTooLarge, best_timetables, search_space, search_timetable, timetable_score
+from planner import search_plan
+from plan_cache import catalog_version, plan_key
+from prerequisites import all_dependents, completed_signature, course_importance, topological_order
+from registry import REGISTRY
+from gurobi_env import ENV_POOL, optimize
+from metrics import CACHE_REQUESTS, Phases
+
+# where each day starts in the slot numbering, a day is 48 slots of 15 mins (9am-9pm)
+SLOT_OFFSETS = {'M': 0, 'T': 48, 'W': 96, 'H': 144, 'F': 192}
+DAY_MASK = (1 << 48) - 1
+
+log = logging.getLogger('scheduler')
 
 class CourseScheduler:
-    def __init__(self, courses, completed, required, max=18,min=12, semesters=15, starting=1):
-        self.courses= courses
+    def __init__(self, courses, completed, required, max=18,min=12, semesters=15, starting=1, env=None, pool=None):
+        self.courses= REGISTRY.records(courses) # {code: CourseRecord}, see registry.py
         self.completed_courses= set(completed)
         self.required_courses= set(required)
         self.max_credits= max
@@ -16,22 +39,58 @@ class CourseScheduler:
         self.total_semesters_remaining = semesters
         self.x= {} # for model 1
         self.x2= {} # for model 2
+        self.timetable= None # picks from solve_timetable
+        self.plan= None # {course: semester} from solve_plan
+        self.plan_gap= None # relative gap of self.plan to the best bound, 0 when it's optimal
+        self.plan_infeasible= False # solve_plan proved there is no plan over the horizon it solved
+        self._section_index= {} # course -> {section key: (entry, is lab)}
         self.y={}# for model 3
+        self.constrs3= {} # handles on the model 3 constraints that depend on the completed courses
         self.starting_semester = starting 
+        self.env= env # gurobi environment for the models, None for the default one (see gurobi_env.EnvPool)
+        self.pool= pool # an EnvPool to take self.env from when the first model is made, dispose gives it back
+        self.pooled_env= False # whether self.env came from self.pool
 
         
   
 
-   
-    
+    def model_env(self):
+        # the environment for a new model. with a pool it's only taken when a model is actually made, so
+        # the searches and the plan cache hits never start one
+        if self.env is None and self.pool is not None:
+            self.env = self.pool.acquire()
+            self.pooled_env = self.env is not None
+        return self.env
+
+    def new_model(self, name):
+        # quiet, the solver log goes through gurobi_env.optimize
+        env = self.model_env()
+        model = gp.Model(name, env=env) if env is not None else gp.Model(name)
+        model.setParam('OutputFlag', 0)
+        return model
+
+    def dispose(self):
+        # frees the gurobi models for the environment to be used again, what was solved stays in
+        # self.plan and self.timetable
+        for model in (self.model, self.model2, self.model3):
+            if model is not None:
+                model.dispose()
+        self.model = self.model2 = self.model3 = None
+        self.x, self.x2, self.y, self.constrs3 = {}, {}, {}, {}
+        if self.pooled_env:
+            self.pool.release(self.env)
+            self.env = None
+            self.pooled_env = False
+
     def build_model(self,alpha=1.5, beta=0.5):
-        self.model = gp.Model("NextSemesterScheduler")
-        self.model.setParam('OutputFlag', 1) 
+        phases = Phases('model') # time of each part of the build, see metrics.py
+        self.model = self.new_model("NextSemesterScheduler")
         # here we add the varibles into the model, in this case they r the  remaing courses 
         self.x= {} 
         for course in self.remaining_courses:
             for section in self.courses[course].get('sections', ['default']):
                 self.x[(course, section)] = self.model.addVar(vtype= GRB.BINARY, name= f"x_{course}_{section}")
+        phases.mark('variables')
 
         
 
@@ -39,7 +98,7 @@ class CourseScheduler:
         #prereusite constrain:
         
         for i in self.remaining_courses:
-            prerequistes=self.courses[i]['prerequisites']
+            prerequistes=self.courses[i].prerequisites
             for j in prerequistes:
                 if j in self.completed_courses:
                     continue 
@@ -51,7 +110,7 @@ class CourseScheduler:
             self.model.addConstr(gp.quicksum(self.x[course,section] for section in self.courses[course].get('sections', ['default'])) <=1)
             
         #credit constrain                          
-        total_credits_pre_sem= gp.quicksum(self.courses[x]['credits']* self.x[x,y] for x in self.remaining_courses for y in self.courses[x].get('sections', ['default'])) 
+        total_credits_pre_sem= gp.quicksum(self.courses[x].credits* self.x[x,y] for x in self.remaining_courses for y in self.courses[x].get('sections', ['default'])) 
         self.model.addConstr(total_credits_pre_sem<= self.max_credits)
         self.model.addConstr(total_credits_pre_sem >= self.min_credits)
         
@@ -69,11 +128,12 @@ class CourseScheduler:
                             self.model.addConstr(self.x[(course,section)]+self.x[(course2,section2)]<=1)
         '''
         # special cases constrain 
-        total_credits = sum(self.courses[course]['credits'] for course in self.completed_courses)
+        total_credits = sum(self.courses[course].credits for course in self.completed_courses)
         special_cases = [i for i, j in self.courses.items() if 'min_credits' in j and i in self.remaining_courses]
         for course in  special_cases:
-            if total_credits < self.courses[course]['min_credits']:
+            if total_credits < self.courses[course].min_credits:
                 self.model.addConstr(gp.quicksum(self.x[course, section] for section in self.courses[course].get('sections', ['default'])) == 0)
+        phases.mark('constraints')
         
 
         objective_expr = gp.quicksum(self.x[(c,s)] * (alpha * self.courses[c].get('importance', 1) - beta * self.courses[c].get('weight', 1)) for c in self.remaining_courses for s in self.courses[c].get('sections', ['default']))
@@ -83,20 +143,25 @@ class CourseScheduler:
                                    
         #self.model.setObjective(total_credits,GRB.MAXIMIZE)
         self.model.setObjective(objective_expr, GRB.MAXIMIZE)
+        phases.mark('objective')
         return self.model
 
 
     
-    def build_model2(self, desired_courses):
-        self.model2 = gp.Model("Time Scheduler")
-        self.model2.setParam("OutputFlag", 1)
+    def build_model2(self, desired_courses, compact=False):
+        phases = Phases('model2')
+        self.model2 = self.new_model("Time Scheduler")
         
         self.x2 = {}
+        masks = {}
         
        
         for course in desired_courses:
-            sections = self.courses[course].get('sections', ['default'])
-            labs = self.courses[course].get('labs', [])
+            index = self.section_index(course)
+            sections = [key for key, (_, lab) in index.items() if not lab]
+            labs = [key for key, (_, lab) in index.items() if lab]
+            for key, (entry, _) in index.items():
+                masks[(course, key)] = self.section_mask(entry)
         
             # add  sections
             for section in sections:
@@ -122,48 +187,168 @@ class CourseScheduler:
                     gp.quicksum(self.x2[(course, lab)] for lab in labs) == 1,
                     name=f"choose_one_lab_{course}"
                 )
+        phases.mark('sections')
         
         # time conflict 
-        all_vars = list(self.x2.keys())
-        for i in range(len(all_vars)):
-            c1, t1 = all_vars[i]
-            for j in range(i + 1, len(all_vars)):
-                c2, t2 = all_vars[j]
-                if self.does_conflict(t1, t2):
-                    self.model2.addConstr(
-                        self.x2[(c1, t1)] + self.x2[(c2, t2)] <= 1,
-                        name=f"time_conflict_{c1}_{t1}_vs_{c2}_{t2}"
-                    )
+        # one constraint per group of sections sharing a slot instead of one per conflicting pair,
+        # every conflicting pair is inside at least one of these groups
+        for i, clique in enumerate(self.conflict_cliques(masks)):
+            self.model2.addConstr(
+                gp.quicksum(self.x2[key] for key in clique) <= 1,
+                name=f"time_conflict_{i}"
+            )
+        phases.mark('conflicts')
+
+        # compact: the objective is timetable.timetable_score, come to campus on as few days as possible
+        # and then keep the slots from first to last class short. a day is worth more than every span
+        # together so the objective orders timetables like the score does. the day and span variables
+        # are continuous (they come out 0/1 and whole slots anyway) so the solution pool only tells
+        # timetables apart by the sections picked
+        if compact:
+            day_weight = len(SLOT_OFFSETS) * DAY_MASK.bit_length() + 1
+            days_used = {}
+            spans = []
+            for day, offset in SLOT_OFFSETS.items():
+                on_day = {key: (masks[key] >> offset) & DAY_MASK for key in self.x2 if (masks[key] >> offset) & DAY_MASK}
+                if not on_day:
+                    continue
+                days_used[day] = self.model2.addVar(ub=1, name=f"day_{day}")
+                first = self.model2.addVar(ub=DAY_MASK.bit_length(), name=f"first_{day}")
+                last = self.model2.addVar(ub=DAY_MASK.bit_length(), name=f"last_{day}")
+                self.model2.addConstr(first <= last, name=f"span_{day}")
+                for key, bits in on_day.items():
+                    start = (bits & -bits).bit_length() - 1
+                    end = bits.bit_length()
+                    self.model2.addConstr(self.x2[key] <= days_used[day], name=f"uses_{day}_{key[0]}_{key[1]}")
+                    self.model2.addConstr(first <= start + (DAY_MASK.bit_length() - start) * (1 - self.x2[key]), name=f"first_{day}_{key[0]}_{key[1]}")
+                    self.model2.addConstr(last >= end * self.x2[key], name=f"last_{day}_{key[0]}_{key[1]}")
+                spans.append(last - first)
+            self.model2.setObjective(day_weight * gp.quicksum(days_used.values()) + gp.quicksum(spans), GRB.MINIMIZE)
+            phases.mark('objective')
+        return self.model2
         
     
 
 
+    def timetable_domains(self, desired_courses):
+        # every (section, lab) combination of a course that doesnt clash with itself, with its slot mask
+        domains = {}
+        for course in desired_courses:
+            index = self.section_index(course)
+            sections = [(key, self.section_mask(entry)) for key, (entry, lab) in index.items() if not lab]
+            labs = [(key, self.section_mask(entry)) for key, (entry, lab) in index.items() if lab]
+            options = []
+            for section, mask in sections:
+                if not labs:
+                    options.append((mask, ((course, section),)))
+                    continue
+                for lab, lab_mask in labs:
+                    if not mask & lab_mask:
+                        options.append((mask | lab_mask, ((course, section), (course, lab))))
+            domains[course] = options
+        return domains
+
+    def solve_timetable(self, desired_courses, backend='auto', max_space=10**6, max_nodes=100000):
+        # picks one section (and lab) per course. backend is 'search' for the built in search,
+        # 'gurobi' for build_model2, or 'auto' to search first and use gurobi when the search is too big.
+        # returns the chosen (course, section) keys or None when there is no timetable
+        self.timetable = None
+        if backend in ('auto', 'search'):
+            domains = self.timetable_domains(desired_courses)
+            if backend == 'search' or gp is None or search_space(domains) <= max_space:
+                try:
+                    phases = Phases('timetable')
+                    self.timetable = search_timetable(domains, max_nodes=max_nodes)
+                    phases.mark('search')
+                    return self.timetable
+                except SearchTooLarge:
+                    if backend == 'search' or gp is None:
+                        raise
+        elif backend != 'gurobi':
+            raise ValueError(f"unknown timetable backend {backend}")
+
+        self.build_model2(desired_courses)
+        optimize(self.model2, name='model2')
+        if self.model2.Status != GRB.OPTIMAL:
+            return None
+        phases = Phases('model2')
+        self.timetable = [key for key, var in self.x2.items() if var.X > 0.5]
+        phases.mark('extract')
+        return self.timetable
+
+    def solve_timetables(self, desired_courses, k=5, backend='auto', max_space=10**5, max_nodes=100000):
+        # the k best distinct timetables from one search/solve, best first, as (score, picks).
+        # score is (days on campus, hours from first to last class), see timetable.timetable_score
+        if backend in ('auto', 'search'):
+            domains = self.timetable_domains(desired_courses)
+            if backend == 'search' or gp is None or search_space(domains) <= max_space:
+                try:
+                    phases = Phases('timetable')
+                    best = best_timetables(domains, k, SLOT_OFFSETS, DAY_MASK, max_nodes=max_nodes)
+                    phases.mark('search')
+                    return best
+                except SearchTooLarge:
+                    if backend == 'search' or gp is None:
+                        raise
+        elif backend != 'gurobi':
+            raise ValueError(f"unknown timetable backend {backend}")
+
+        # the compact objective is the score, so gurobi's pool of the k best solutions is the k best timetables
+        self.build_model2(desired_courses, compact=True)
+        self.model2.setParam('PoolSearchMode', 2)
+        self.model2.setParam('PoolSolutions', k)
+        optimize(self.model2, name='model2')
+        phases = Phases('model2')
+        masks = {key: self.section_mask(self.section_index(key[0])[key[1]][0]) for key in self.x2}
+        found = {}
+        for n in range(self.model2.SolCount):
+            self.model2.setParam('SolutionNumber', n)
+            picks = [key for key, var in self.x2.items() if var.Xn > 0.5]
+            mask = 0
+            for key in picks:
+                mask |= masks[key]
+            found.setdefault(tuple(picks), timetable_score(mask, SLOT_OFFSETS, DAY_MASK))
+        ranked = sorted(found.items(), key=lambda item: item[1])[:k]
+        phases.mark('extract')
+        return [(score, list(picks)) for picks, score in ranked]
+
     
                 
-    def build_model3(self, beta=1.5, alpha=0.5, gamma=0.25,delta=1):
-        self.model3 = gp.Model("FullPlanScheduler")
-        self.model3.setParam('OutputFlag', 1)
+    def build_model3(self, beta=1.5, alpha=0.5, gamma=0.25,delta=1, balance='quadratic', formulation='classic', windows=False, min_horizon=None, warm_start=False):
+        phases = Phases('model3')
+        self.model3 = self.new_model("FullPlanScheduler")
+
+        # min_horizon: plan over the shortest horizon that can work, but at least min_horizon semesters if possible
+        if min_horizon is not None:
+            self.total_semesters_remaining = self.shortest_horizon(min_horizon) or self.total_semesters_remaining
     
         semesters = list(range(self.starting_semester, self.total_semesters_remaining + 1))  
         self.y = {}  
-    
+        self.constrs3 = {'take once': {}, 'prereq': {}, 'restricted': {}}
+
+        # windows: only make variables for the semesters a course can actually go in
+        allowed = self.semester_windows() if windows else {course: semesters for course in self.remaining_courses}
         for course in self.remaining_courses:
-            for sem in semesters:
+            for sem in allowed[course]:
                 self.y[(course, sem)] = self.model3.addVar(vtype=GRB.BINARY, name=f"y_{course}_sem{sem}")
+        # warm_start: give gurobi the greedy plan as a starting solution (courses it couldn't place are left open)
+        if warm_start:
+            self.start_from_greedy_plan()
+        phases.mark('variables')
+
         # must take all cources once 
         for course in self.remaining_courses:
-            self.model3.addConstr(gp.quicksum(self.y[course, s] for s in semesters) == 1, name=f"take {course} once")
+            self.constrs3['take once'][course] = self.model3.addConstr(gp.quicksum(self.y[course, s] for s in semesters if (course, s) in self.y) == 1, name=f"take {course} once")
 
         # prerequsite constrain 
-        for course in self.remaining_courses:
-            prereqs = self.courses[course]['prerequisites']
-            for prereq in prereqs:
-                if prereq in self.remaining_courses:
-                    self.model3.addConstr(gp.quicksum(s * self.y[(course, s)] for s in semesters) >= gp.quicksum(s * self.y[(prereq, s)] for s in semesters)+1, name="prereqsite")
+        if formulation not in ('classic', 'strong'):
+            raise ValueError(f"unknown formulation {formulation}")
+        for course, prereq in self.prerequisite_pairs(reduce=formulation == 'strong'):
+            self.constrs3['prereq'][course, prereq] = self.add_prerequisite(course, prereq, formulation, semesters)
         #credits per sem constrain
 
         for s in semesters:
-            total_credits = gp.quicksum(self.y[(course, s)] * self.courses[course]['credits']for course in self.remaining_courses)
+            total_credits = gp.quicksum(self.y[(course, s)] * self.courses[course].credits for course in self.remaining_courses if (course, s) in self.y)
             if s%3==0:# so if summer....
                  self.model3.addConstr(total_credits <= 6, name=f"max credits for sem {s}") 
             elif s>12:# for the fifth year, max is 18 but min is 0 
@@ -176,43 +361,45 @@ class CourseScheduler:
         
         credits_up_to_semester = {
         s: gp.quicksum(
-            self.courses[c]['credits'] * self.y[c, t]
-            for c in self.remaining_courses
-            for t in semesters if t < s
-        ) + sum(self.courses[c]['credits'] for c in self.completed_courses if c in self.courses)
+            self.courses[c].credits * var
+            for (c, t), var in self.y.items() if t < s
+        ) + sum(self.courses[c].credits for c in self.completed_courses if c in self.courses)
         for s in semesters
     }
 
 
         special_cases = [i for i, j in self.courses.items() if 'min_credits' in j]
         for course in special_cases:
-            required_credits = self.courses[course]['min_credits']
+            required_credits = self.courses[course].min_credits
             for s in semesters:
                 if (course, s) in self.y:
-                    self.model3.addConstr(
+                    self.constrs3['restricted'][course, s] = self.model3.addConstr(
                         self.y[course, s] * required_credits <= credits_up_to_semester[s],
                         name=f"restricted course {course} in sem {s}")
                         
         # u cant take courses with internships 
-        if 'ENGR399' in self.remaining_courses:
-            self.model3.addConstrs((gp.quicksum(self.y[c, s] for c in self.remaining_courses if c != 'ENGR399') <= 100 * (1 - self.y['ENGR399', s])for s in semesters))
-        if 'ENGR399(2)' in self.remaining_courses:
-            self.model3.addConstrs((gp.quicksum(self.y[c, s] for c in self.remaining_courses if c != 'ENGR399(2)') <= 100 * (1 - self.y['ENGR399(2)', s])for s in semesters))
+        if formulation == 'strong':
+            # one small constraint per course that could share the semester instead of a big M over all of them
+            for internship in ('ENGR399', 'ENGR399(2)'):
+                if internship not in self.remaining_courses:
+                    continue
+                for s in semesters:
+                    if (internship, s) not in self.y or not self.is_available(internship, s):
+                        continue
+                    for c in self.remaining_courses:
+                        if c != internship and (c, s) in self.y and self.is_available(c, s):
+                            self.model3.addConstr(self.y[c, s] + self.y[internship, s] <= 1, name=f"internship {internship} excludes {c} in {s}")
+        else:
+            for internship in ('ENGR399', 'ENGR399(2)'):
+                if internship in self.remaining_courses:
+                    self.model3.addConstrs((gp.quicksum(self.y[c, s] for c in self.remaining_courses if c != internship and (c, s) in self.y) <= 100 * (1 - self.y[internship, s])for s in semesters if (internship, s) in self.y))
 
 
         # availabilty constrain 
-        offered_sems= {'fall', 'spring' , 'summer'}
-        for course in self.remaining_courses:
-            if 'available_in' not in self.courses[course]:
-                continue
-            not_available_in= offered_sems- self.courses[course]['available_in']
-            for s in semesters:
-                if s % 3 == 1 and 'fall' in not_available_in:
-                    self.model3.addConstr(self.y[course, s] == 0)
-                elif s % 3 == 2 and 'spring' in not_available_in:
-                    self.model3.addConstr(self.y[course, s] == 0)
-                elif s % 3 == 0 and 'summer' in not_available_in:
-                    self.model3.addConstr(self.y[course, s] == 0)
+        for (course, s), var in self.y.items():
+            if not self.is_available(course, s):
+                self.model3.addConstr(var == 0)
+        phases.mark('constraints')
             
 
        
@@ -220,50 +407,382 @@ class CourseScheduler:
         # IMPORTANCE 
         #so since its multiplied by s (semester), to get the lowest score pssible it takes high importance courses sooner 
         importance_term = gp.quicksum(
-            self.y[(course, s)] *self.courses[course].get('importance', 1) * s
-            for course in self.remaining_courses
-            for s in semesters
+            var *self.courses[course].get('importance', 1) * s
+            for (course, s), var in self.y.items()
         )
 
         # PENALTY 
         # to minimize this, it would rather make the (taken semester - prefered semster) = 0 or as close to 0 as possible 
-        penalties = {    (c, s): abs(self.year_of_semester(s) - self.courses[c].get('year', self.year_of_semester(s)))  for c in self.remaining_courses
-                for s in semesters  }
+        penalties = {    (c, s): abs(self.year_of_semester(s) - self.courses[c].get('year', self.year_of_semester(s)))  for (c, s) in self.y  }
         penalty_term = gp.quicksum(
-            self.y[(course, s)] *  penalties[(course, s)]
-            for course in self.remaining_courses
-            for s in semesters if s<13
+            var *  penalties[(course, s)]
+            for (course, s), var in self.y.items() if s<13
         )
         fifth_year_penalty = gp.quicksum(
-            self.y[(course, s) ]*s
-            for course in self.remaining_courses
-            for s in semesters if s > 12
+            var*s
+            for (course, s), var in self.y.items() if s > 12
         )
 
 
         # BALANCE WORKLOAD 
-        # here since we r looking for balacning the overload over all semesters, we will want to make the load similar, so we calcute the 'variance' and try to minimze that 
+        # here since we r looking for balacning the overload over all semesters, we will want to make the load similar.
+        # balance='quadratic' minimizes the 'variance' (makes the model a MIQP), 'abs' minimizes the absolute
+        # deviations from the mean and 'minmax' the heaviest semester, both keep it a MILP
         taken_sems = [s for s in semesters if s % 3 != 0]
+        loads = {s: gp.quicksum(self.y[c, s] * self.courses[c].get('weight', 1) for c in self.remaining_courses if (c, s) in self.y) for s in taken_sems}
+        mean_weight = gp.quicksum(loads.values()) / (len(semesters)- len(semesters)//3)
 
-    
-        avg_weight = gp.quicksum(  self.y[(c, s)] * self.courses[c]['weight']  for s in taken_sems for c in self.remaining_courses) / len(taken_sems)
-         
-        workload_term = gp.quicksum((gp.quicksum(self.y[c, s] * self.courses[c]['weight'] for c in self.remaining_courses) - avg_weight) ** 2 for s in taken_sems)
-        
-
-        mean_weight = gp.quicksum(self.y[(c,s)] * self.courses[c]['weight'] for c in self.remaining_courses for s in semesters if s%3!=0)/ (len(semesters)- len(semesters)//3)
-        workload_balance_term = gp.quicksum(
-            (gp.quicksum(self.y[c, s] * self.courses[c].get('weight', 1) for c in self.remaining_courses) - mean_weight) ** 2
-            for s in semesters if s%3!=0
-        )
+        if beta == 0:
+            workload_balance_term = 0
+        elif balance == 'quadratic':
+            workload_balance_term = gp.quicksum((loads[s] - mean_weight) ** 2 for s in taken_sems)
+        elif balance == 'abs':
+            deviation = self.model3.addVars(taken_sems, lb=0, name="load_deviation")
+            for s in taken_sems:
+                self.model3.addConstr(deviation[s] >= loads[s] - mean_weight, name=f"load above mean {s}")
+                self.model3.addConstr(deviation[s] >= mean_weight - loads[s], name=f"load below mean {s}")
+            workload_balance_term = gp.quicksum(deviation.values())
+        elif balance == 'minmax':
+            max_load = self.model3.addVar(lb=0, name="max_load")
+            for s in taken_sems:
+                self.model3.addConstr(max_load >= loads[s], name=f"max load {s}")
+            workload_balance_term = max_load
+        else:
+            raise ValueError(f"unknown balance mode {balance}")
 
         objective_expr = alpha*importance_term + beta*workload_balance_term +   gamma* penalty_term + delta*fifth_year_penalty 
         self.model3.setObjective(objective_expr, GRB.MINIMIZE)
+        phases.mark('objective')
         return self.model3
         
 
 
 
+    def add_prerequisite(self, course, prereq, formulation, semesters):
+        # prereq has to be taken before course in model 3, returns the constraints
+        if formulation == 'classic':
+            return [self.model3.addConstr(gp.quicksum(s * self.y[(course, s)] for s in semesters if (course, s) in self.y) >= gp.quicksum(s * self.y[(prereq, s)] for s in semesters if (prereq, s) in self.y)+1, name="prereqsite")]
+        # strong: taken by semester s only if the prereq was taken before s, for every s. this is a lot tighter
+        # in the LP relaxation than comparing the average semesters, and prereqs implied by another
+        # prereq are dropped first (see prerequisite_pairs)
+        constrs = []
+        taken = 0
+        prereq_taken = 0
+        for s in semesters:
+            if (course, s) in self.y:
+                # (no variable means nothing new is taken, so the one for the semester before covers it)
+                taken += self.y[course, s]
+                constrs.append(self.model3.addConstr(taken <= prereq_taken, name=f"prereq {prereq} before {course} by {s}"))
+            if (prereq, s) in self.y:
+                prereq_taken += self.y[prereq, s]
+        return constrs
+
+    def start_from_greedy_plan(self):
+        for course, sem in self.greedy_plan().items():
+            for s in range(self.starting_semester, self.total_semesters_remaining + 1):
+                if (course, s) in self.y:
+                    self.y[course, s].Start = 1 if s == sem else 0
+
+    def solve_plan(self, backend='auto', max_courses=15, max_nodes=100000, template=None, time_limit=None, mip_gap=None, on_incumbent=None,
+                   cache=None, beta=1.5, alpha=0.5, gamma=0.25, delta=1, min_horizon=None, threads=None, **options):
+        # {course: semester} for the whole plan, or None when there is none. backend is 'search' for the
+        # search in planner.py, 'gurobi' for build_model3 (copied from the template for that key if one is
+        # given), or 'auto' to search when there are at most max_courses left and use gurobi for the rest
+        # and when the search is too big. the search has no balance term so it needs beta=0, and without
+        # gurobipy installed everything is searched. options go to build_model3.
+        # time_limit (seconds) and mip_gap stop gurobi early with the best plan so far, its gap ends up in
+        # plan_gap. on_incumbent(plan, objective, gap) is called with every better plan found on the way.
+        # threads caps the cores gurobi uses (see jobs.JobQueue).
+        # cache is a plan_cache.PlanCache, optimal plans are kept there and given back for the same inputs
+        if cache is not None:
+            version = catalog_version(self.courses)
+            key = plan_key(version, required=self.required_courses, completed=completed_signature(self.courses, self.completed_courses),
+                           starting=self.starting_semester, semesters=self.total_semesters_remaining, max=self.max_credits,
+                           min=self.min_credits, beta=beta, alpha=alpha, gamma=gamma, delta=delta, min_horizon=min_horizon, options=options)
+            cached = cache.get(key)
+            if cached is not None:
+                self.plan = cached
+                self.plan_gap = 0.0
+                return self.plan
+            self.solve_plan(backend, max_courses, max_nodes, template, time_limit, mip_gap, on_incumbent,
+                            beta=beta, alpha=alpha, gamma=gamma, delta=delta, min_horizon=min_horizon, threads=threads, **options)
+            # (a plan cut short by the time limit isn't worth keeping)
+            if self.plan is not None and self.plan_gap is not None and self.plan_gap <= 1e-4:
+                cache.put(key, version, self.plan)
+            return self.plan
+
+        if min_horizon is not None:
+            # over the horizon shortest_horizon picks (the whole one when none passes its checks), or the
+            # next one it would have picked when there is no plan over that one. they are looked at one at
+            # a time since most plans are found over the first
+            started = time.monotonic()
+            horizons = self.candidate_horizons(min_horizon)
+            horizon = next(horizons, self.total_semesters_remaining)
+            while horizon is not None:
+                self.total_semesters_remaining = horizon
+                left = None if time_limit is None else max(0, time_limit - (time.monotonic() - started))
+                self.solve_plan(backend, max_courses, max_nodes, template, left, mip_gap, on_incumbent,
+                                beta=beta, alpha=alpha, gamma=gamma, delta=delta, threads=threads, **options)
+                if self.plan is not None or not self.plan_infeasible:
+                    break
+                if self.model3 is not None:
+                    self.model3.dispose()
+                    self.model3 = None
+                horizon = next(horizons, None)
+            return self.plan
+
+        started = time.monotonic()
+        self.plan = None
+        self.plan_gap = None
+        self.plan_infeasible = False
+        if backend not in ('auto', 'search', 'gurobi'):
+            raise ValueError(f"unknown plan backend {backend}")
+        if backend == 'search' or (backend == 'auto' and gp is None):
+            if beta != 0:
+                raise ValueError("the plan search has no balance term, use beta=0")
+        if backend == 'search' or (backend == 'auto' and beta == 0 and (gp is None or len(self.remaining_courses) <= max_courses)):
+            def on_plan(cost, plan, bound):
+                on_incumbent(plan, cost, relative_gap(cost, bound))
+            try:
+                phases = Phases('plan')
+                found = self.search_plan(alpha, gamma, delta, max_nodes, on_plan=on_plan if on_incumbent else None)
+                phases.mark('search')
+                if found:
+                    self.plan = found[1]
+                    self.plan_gap = 0.0
+                else:
+                    self.plan_infeasible = True
+                return self.plan
+            except SearchTooLarge:
+                if backend == 'search' or gp is None:
+                    raise
+
+        weights = dict(beta=beta, alpha=alpha, gamma=gamma, delta=delta, **options)
+        model = self.build_model3_from_template(template, **weights) if template is not None else self.build_model3(**weights)
+        if time_limit is not None:
+            # what's left of it after the search
+            model.setParam('TimeLimit', max(0, time_limit - (time.monotonic() - started)))
+        if mip_gap is not None:
+            model.setParam('MIPGap', mip_gap)
+        if threads is not None:
+            model.setParam('Threads', threads)
+        if on_incumbent is None:
+            optimize(model, name='model3')
+        else:
+            keys = list(self.y)
+            variables = [self.y[key] for key in keys]
+            reported = [float('inf')]
+            def callback(model, where):
+                # MIPSOL also fires for solutions that aren't better than the incumbent
+                if where == GRB.Callback.MIPSOL and model.cbGet(GRB.Callback.MIPSOL_OBJ) < reported[0]:
+                    values = model.cbGetSolution(variables)
+                    reported[0] = model.cbGet(GRB.Callback.MIPSOL_OBJ)
+                    bound = model.cbGet(GRB.Callback.MIPSOL_OBJBND)
+                    on_incumbent({course: s for (course, s), x in zip(keys, values) if x > 0.5}, reported[0], relative_gap(reported[0], bound))
+            optimize(model, callback, name='model3')
+        if model.Status not in (GRB.OPTIMAL, GRB.TIME_LIMIT) or model.SolCount == 0:
+            self.plan_infeasible = model.Status in (GRB.INFEASIBLE, GRB.INF_OR_UNBD)
+            return None
+        phases = Phases('model3')
+        self.plan = {course: s for (course, s), var in self.y.items() if var.X > 0.5}
+        self.plan_gap = relative_gap(model.ObjVal, model.ObjBound)
+        phases.mark('extract')
+        return self.plan
+
+    def search_plan(self, alpha=0.5, gamma=0.25, delta=1, max_nodes=100000, on_plan=None):
+        # the build_model3 plan without the balance term from planner.search_plan, as (cost, {course: semester})
+        windows = self.semester_windows()
+        semesters = [(s, 0 if s % 3 == 0 or s > 12 else self.min_credits, 6 if s % 3 == 0 else self.max_credits)
+                     for s in range(self.starting_semester, self.total_semesters_remaining + 1)]
+        costs = {c: {s: self.semester_cost(c, s, alpha, gamma, delta) for s in windows[c]} for c in self.remaining_courses}
+        return search_plan(semesters, costs,
+                           credits={c: self.courses[c].credits for c in self.remaining_courses},
+                           prereqs={c: self.courses[c].prerequisites for c in self.remaining_courses},
+                           needs={c: self.courses[c].min_credits for c in self.remaining_courses if 'min_credits' in self.courses[c]},
+                           done=sum(self.courses[c].credits for c in self.completed_courses if c in self.courses),
+                           alone={c for c in ('ENGR399', 'ENGR399(2)') if c in self.remaining_courses},
+                           max_nodes=max_nodes, on_plan=on_plan)
+
+    def semester_cost(self, course, s, alpha=0.5, gamma=0.25, delta=1):
+        # what taking course in semester s adds to the build_model3 objective, apart from the balance term
+        info = self.courses[course]
+        cost = alpha * info.get('importance', 1) * s
+        if s > 12:
+            cost += delta * s
+        else:
+            cost += gamma * abs(self.year_of_semester(s) - info.get('year', self.year_of_semester(s)))
+        return cost
+
+    def build_model3_matrix(self, beta=1.5, alpha=0.5, gamma=0.25, delta=1, balance='quadratic', formulation='classic', windows=False, min_horizon=None, warm_start=False):
+        # the same model as build_model3 built with the matrix api. y is one MVar over the course x semester
+        # grid, flattened course by course, and every group of constraints is a single sparse matrix product
+        # (the credits before each semester are a prefix sum over the semester loads). entries build_model3
+        # has no variable for, or only a var == 0 constraint, get an upper bound of 0 instead
+        if formulation not in ('classic', 'strong'):
+            raise ValueError(f"unknown formulation {formulation}")
+        if balance not in ('quadratic', 'abs', 'minmax'):
+            raise ValueError(f"unknown balance mode {balance}")
+        phases = Phases('model3_matrix')
+        self.model3 = self.new_model("FullPlanScheduler")
+
+        if min_horizon is not None:
+            self.total_semesters_remaining = self.shortest_horizon(min_horizon) or self.total_semesters_remaining
+
+        courses = sorted(self.remaining_courses)
+        semesters = np.arange(self.starting_semester, self.total_semesters_remaining + 1)
+        n, m = len(courses), len(semesters)
+        row = {course: i for i, course in enumerate(courses)}
+        windows = {course: set(sems) for course, sems in self.semester_windows().items()} if windows else None
+        allowed = np.array([[self.is_available(c, s) and (windows is None or s in windows[c]) for s in semesters] for c in courses], dtype=bool).reshape(n, m)
+        credits = np.array([self.courses[c].credits for c in courses], dtype=float)
+
+        y = self.model3.addMVar(n * m, vtype=GRB.BINARY, ub=allowed.ravel().astype(float))
+        y.VarName = [f"y_{c}_sem{s}" for c in courses for s in semesters]
+        variables = y.tolist()
+        self.y = {(c, int(s)): variables[i * m + j] for i, c in enumerate(courses) for j, s in enumerate(semesters) if allowed[i, j]}
+        self.constrs3 = {}
+        if warm_start:
+            self.start_from_greedy_plan()
+        phases.mark('variables')
+
+        # must take all cources once
+        self.model3.addConstr(sp.kron(sp.identity(n), np.ones((1, m)), format='csr') @ y == 1, name="take once")
+
+        # prerequsite constrain
+        pairs = self.prerequisite_pairs(reduce=formulation == 'strong')
+        course_of = sp.csr_matrix((np.ones(len(pairs)), (range(len(pairs)), [row[c] for c, p in pairs])), shape=(len(pairs), n))
+        prereq_of = sp.csr_matrix((np.ones(len(pairs)), (range(len(pairs)), [row[p] for c, p in pairs])), shape=(len(pairs), n))
+        before = sp.csr_matrix(np.tril(np.ones((m, m)), -1)) # before[j, t] = 1 when t comes before j
+        if formulation == 'classic':
+            self.model3.addConstr(sp.kron(course_of - prereq_of, semesters.reshape(1, m), format='csr') @ y >= 1, name="prereqsite")
+        elif pairs:
+            # taken by each semester it could be taken in only if the prereq was taken before
+            taken_by = sp.kron(course_of, before + sp.identity(m), format='csr') - sp.kron(prereq_of, before, format='csr')
+            rows = allowed[[row[c] for c, p in pairs]].ravel()
+            self.model3.addConstr(taken_by[rows] @ y <= 0, name="prereq")
+
+        # credits per sem constrain, summers up to 6 and no min after the fourth year
+        load = sp.kron(credits.reshape(1, n), sp.identity(m), format='csr')
+        self.model3.addConstr(load @ y <= np.where(semesters % 3 == 0, 6, self.max_credits), name="max credits")
+        regular = np.flatnonzero((semesters % 3 != 0) & (semesters <= 12))
+        self.model3.addConstr(load[regular] @ y >= self.min_credits, name="min credits")
+
+        # restricted cources constrain e.g sdp, the credits before a semester are the prefix sum of the loads
+        done = sum(self.courses[c].credits for c in self.completed_courses if c in self.courses)
+        credits_before = sp.kron(credits.reshape(1, n), before, format='csr')
+        restricted = [(row[c], j) for c in courses if 'min_credits' in self.courses[c] for j in range(m) if allowed[row[c], j]]
+        if restricted:
+            needed = sp.csr_matrix(([self.courses[courses[i]]['min_credits'] for i, j in restricted], (range(len(restricted)), [i * m + j for i, j in restricted])), shape=(len(restricted), n * m))
+            self.model3.addConstr((needed - credits_before[[j for i, j in restricted]]) @ y <= done, name="restricted course")
+
+        # u cant take courses with internships
+        for internship in ('ENGR399', 'ENGR399(2)'):
+            if internship not in row:
+                continue
+            i = row[internship]
+            sems = [j for j in range(m) if allowed[i, j]]
+            if formulation == 'strong':
+                clashes = [(k, j) for j in sems for k in range(n) if k != i and allowed[k, j]]
+                if clashes:
+                    pick = sp.csr_matrix((np.ones(2 * len(clashes)), (list(range(len(clashes))) * 2, [k * m + j for k, j in clashes] + [i * m + j for k, j in clashes])), shape=(len(clashes), n * m))
+                    self.model3.addConstr(pick @ y <= 1, name=f"internship {internship}")
+            elif sems:
+                others = sp.csr_matrix(np.where(np.arange(n) == i, 100.0, 1.0).reshape(1, n))
+                self.model3.addConstr(sp.kron(others, sp.identity(m), format='csr')[sems] @ y <= 100, name=f"internship {internship}")
+        phases.mark('constraints')
+
+        # objective: importance, preferred year penalty and fifth year penalty as one cost per entry
+        importance = np.array([self.courses[c].get('importance', 1) for c in courses], dtype=float)
+        year = (semesters - 1) // 3 + 1
+        preferred = np.array([self.courses[c].get('year', np.nan) for c in courses], dtype=float).reshape(n, 1)
+        penalty = np.where(np.isnan(preferred) | (semesters > 12), 0, np.abs(year - preferred))
+        cost = alpha * importance.reshape(n, 1) * semesters + gamma * penalty + delta * np.where(semesters > 12, semesters, 0)
+        objective_expr = cost.ravel() @ y
+
+        # balance workload, same modes as build_model3
+        if beta != 0:
+            taken_sems = np.flatnonzero(semesters % 3 != 0)
+            weights = np.array([self.courses[c].get('weight', 1) for c in courses], dtype=float)
+            loads = sp.kron(weights.reshape(1, n), sp.identity(m), format='csr')[taken_sems]
+            deviation_of = sp.csr_matrix(loads.toarray() - loads.sum(axis=0) / (m - m // 3))
+            if balance == 'quadratic':
+                deviation = deviation_of @ y
+                objective_expr += beta * (deviation @ deviation)
+            elif balance == 'abs':
+                deviation = self.model3.addMVar(len(taken_sems), lb=0, name="load_deviation")
+                self.model3.addConstr(deviation >= deviation_of @ y, name="load above mean")
+                self.model3.addConstr(deviation >= -deviation_of @ y, name="load below mean")
+                objective_expr += beta * deviation.sum()
+            else:
+                max_load = self.model3.addMVar(1, lb=0, name="max_load")
+                self.model3.addConstr(loads @ y - max_load <= 0, name="max load")
+                objective_expr += beta * max_load.sum()
+
+        self.model3.setObjective(objective_expr, GRB.MINIMIZE)
+        phases.mark('objective')
+        return self.model3
+
+    def build_model3_from_template(self, key, windows=False, min_horizon=None, warm_start=False, **options):
+        # the same model as build_model3 but copied from a template built once per key (the major), horizon,
+        # starting semester and options, and then fixed for this student's completed courses. this keeps the
+        # quicksum building out of the requests
+        if min_horizon is not None:
+            self.total_semesters_remaining = self.shortest_horizon(min_horizon) or self.total_semesters_remaining
+        template_key = (key, frozenset(self.required_courses), self.total_semesters_remaining, self.starting_semester,
+                        self.max_credits, self.min_credits, tuple(sorted(options.items())))
+        # gurobi models aren't thread safe and the server's request threads share the templates, so a
+        # template is built and copied under its key's lock (and built only once)
+        with plan_templates_lock:
+            lock = plan_template_locks.setdefault(template_key, threading.Lock())
+        with lock:
+            if template_key not in plan_templates:
+                CACHE_REQUESTS.inc(cache='template', result='miss')
+                plan_templates[template_key] = PlanTemplate(self.courses, self.required_courses, max=self.max_credits, min=self.min_credits,
+                                                            semesters=self.total_semesters_remaining, starting=self.starting_semester, **options)
+            else:
+                CACHE_REQUESTS.inc(cache='template', result='hit')
+            template = plan_templates[template_key]
+            phases = Phases('model3_template')
+            env = self.model_env()
+            self.model3 = template.model.copy(env=env) if env is not None else template.model.copy()
+            phases.mark('copy')
+        variables = self.model3.getVars()
+        constrs = self.model3.getConstrs()
+
+        # completed courses and semesters outside the windows are fixed to 0 and left out of y
+        allowed = self.semester_windows() if windows else None
+        self.y = {}
+        for (course, s), i in template.y.items():
+            if course in self.remaining_courses and (allowed is None or s in allowed[course]):
+                self.y[course, s] = variables[i]
+            else:
+                variables[i].UB = 0
+
+        # and they don't have to be taken or come after their prereqs anymore
+        drop = [constrs[i] for course, i in template.take_once.items() if course in self.completed_courses]
+        for (course, prereq), group in template.prereq.items():
+            if course in self.completed_courses or prereq in self.completed_courses:
+                drop += [constrs[i] for i in group]
+        self.model3.remove(drop)
+
+        # the template has nothing completed, so the credits before each semester start from 0
+        done = sum(self.courses[c].credits for c in self.completed_courses if c in self.courses)
+        for i in template.restricted.values():
+            constrs[i].RHS = done
+
+        # with some prereqs done, one the template dropped as implied can be needed on its own again
+        formulation = options.get('formulation', 'classic')
+        semesters = list(range(self.starting_semester, self.total_semesters_remaining + 1))
+        self.constrs3 = {'take once': {}, 'prereq': {}, 'restricted': {}}
+        for course, prereq in self.prerequisite_pairs(reduce=formulation == 'strong'):
+            if (course, prereq) not in template.prereq:
+                self.constrs3['prereq'][course, prereq] = self.add_prerequisite(course, prereq, formulation, semesters)
+
+        if warm_start:
+            self.start_from_greedy_plan()
+        phases.mark('constraints')
+        return self.model3
+
     '''
         objective_expr = gp.quicksum(
         (self.y[(course, s)] * s * (beta * self.courses[course].get('weight', 1) - alpha * self.courses[course].get('importance', 1) )- gamma * penalties[(course, s)])
@@ -276,9 +795,235 @@ class CourseScheduler:
         
 
 
+    def prerequisite_pairs(self, reduce=False):
+        # (course, prereq) pairs where both still have to be taken. with reduce, a pair is dropped when the
+        # prereq is already required through another prereq of the course (transitive reduction)
+        pairs = [(course, prereq) for course in self.remaining_courses for prereq in self.courses[course].prerequisites if prereq in self.remaining_courses]
+        if not reduce:
+            return pairs
+
+        reach = {}
+        def reachable(course):
+            # remaining courses that have to come before course
+            if course not in reach:
+                found = set()
+                for prereq in self.courses[course].prerequisites:
+                    if prereq in self.remaining_courses:
+                        found.add(prereq)
+                        found |= reachable(prereq)
+                reach[course] = found
+            return reach[course]
+
+        reduced = []
+        for course, prereq in pairs:
+            others = [p for p in self.courses[course].prerequisites if p != prereq and p in self.remaining_courses]
+            if not any(prereq in reachable(other) for other in others):
+                reduced.append((course, prereq))
+        return reduced
+
+    def semester_windows(self):
+        # {course: semesters it can go in} for the remaining courses. the earliest semester comes from the
+        # prereq chain and the min_credits rule (with full loads before it), the latest from the chain of
+        # courses that still need it, and in between only the terms it is offered in
+        earliest, latest = self.semester_bounds()
+        return {c: [s for s in range(earliest[c], latest[c] + 1) if self.is_available(c, s)] for c in self.remaining_courses}
+
+    def semester_bounds(self):
+        # ({course: earliest semester}, {course: latest semester}) for semester_windows. the earliest is
+        # past the horizon, or the latest before the starting semester, when there is no such semester
+        first, last = self.starting_semester, self.total_semesters_remaining
+        credits_before = {}
+        total = sum(self.courses[c].credits for c in self.completed_courses if c in self.courses)
+        for s in range(first, last + 2):
+            credits_before[s] = total
+            total += 6 if s % 3 == 0 else self.max_credits
+
+        prereqs = {c: [p for p in self.courses[c].prerequisites if p in self.remaining_courses] for c in self.remaining_courses}
+        dependents = {c: [] for c in self.remaining_courses}
+        for course, before in prereqs.items():
+            for prereq in before:
+                dependents[prereq].append(course)
+
+        earliest = {}
+        def earliest_semester(course):
+            if course not in earliest:
+                earliest[course] = first - 1
+                s = max([first] + [earliest_semester(p) + 1 for p in prereqs[course]])
+                need = self.courses[course].get('min_credits', 0)
+                while s <= last and (not self.is_available(course, s) or credits_before[s] < need):
+                    s += 1
+                earliest[course] = s
+            return earliest[course]
+
+        latest = {}
+        def latest_semester(course):
+            if course not in latest:
+                latest[course] = last + 1
+                s = min([last] + [latest_semester(d) - 1 for d in dependents[course]])
+                while s >= first and not self.is_available(course, s):
+                    s -= 1
+                latest[course] = s
+            return latest[course]
+
+        for course in self.remaining_courses:
+            earliest_semester(course)
+            latest_semester(course)
+        return earliest, latest
+
+    def plan_problems(self, min_horizon=None):
+        # why no plan can work, found without building a model. [] when none of the checks fails, which
+        # doesn't promise a plan but catches the usual causes: prereq cycles, courses that their prereq
+        # chain, terms offered or min_credits push past the horizon, and credits that don't fit between
+        # the min and max loads. with min_horizon it is [] when any horizon shortest_horizon(min_horizon)
+        # looks at passes, otherwise the problems are the ones of the scheduler's horizon
+        graph = {c: [p for p in self.courses[c].prerequisites if p in self.remaining_courses] for c in self.remaining_courses}
+        try:
+            topological_order(graph)
+        except ValueError as error:
+            return [str(error)]
+        if min_horizon is not None and self.shortest_horizon(min_horizon) is not None:
+            return []
+
+        problems = []
+        first, last = self.starting_semester, self.total_semesters_remaining
+        earliest, latest = self.semester_bounds()
+        for course in sorted(self.remaining_courses):
+            if not any(self.is_available(course, s) for s in (1, 2, 3)):
+                problems.append(f"{course} isn't offered in any term.")
+            elif earliest[course] > last:
+                problems.append(f"{course} can't be taken by semester {last} (prerequisites, terms offered or credits needed before it).")
+            elif earliest[course] > latest[course] or not any(self.is_available(course, s) for s in range(earliest[course], latest[course] + 1)):
+                problems.append(f"{course} can't be taken before semester {earliest[course]} but has to be done by semester {latest[course]} for the courses that need it.")
+
+        credits = sum(self.courses[c].credits for c in self.remaining_courses)
+        most = sum(6 if s % 3 == 0 else self.max_credits for s in range(first, last + 1))
+        least = sum(self.min_credits for s in range(first, last + 1) if s % 3 != 0 and s <= 12)
+        if credits > most:
+            problems.append(f"{credits} credits are left but at most {most} fit by semester {last}.")
+        if credits < least:
+            problems.append(f"Only {credits} credits are left but the semesters up to {min(last, 12)} need at least {self.min_credits} each.")
+        return problems
+
+    def minimal_semesters(self, limit=30):
+        # the fewest semesters (from the starting one) any plan needs, by the same checks as shortest_horizon.
+        # None when no horizon up to limit semesters passes them
+        horizon = self.total_semesters_remaining
+        self.total_semesters_remaining = self.starting_semester + limit - 1
+        try:
+            found = self.shortest_horizon()
+        finally:
+            self.total_semesters_remaining = horizon
+        return None if found is None else found - self.starting_semester + 1
+
+    def greedy_plan(self):
+        # {course: semester} filling the semesters in order with whatever is ready, the ones that have to be
+        # done soonest (end of their window) first. it respects prereqs, credit caps, min_credits, when courses are offered and internships
+        # being alone in their semester. summers only get internships and the rest is spread evenly over the
+        # fall/spring semesters left, but the min load isn't guaranteed so it's a start and not always feasible
+        windows = self.semester_windows()
+        order = sorted(self.remaining_courses, key=lambda c: (windows[c][-1] if windows[c] else self.total_semesters_remaining + 1,
+                                                              -self.courses[c].get('importance', 1), self.courses[c].get('year', 1), c))
+        credits = sum(self.courses[c].credits for c in self.completed_courses if c in self.courses)
+        plan = {}
+
+        def ready(course, s):
+            return (s in windows[course]
+                    and credits >= self.courses[course].get('min_credits', 0)
+                    and all(plan.get(p, s) < s for p in self.courses[course].prerequisites if p in self.remaining_courses))
+
+        for s in range(self.starting_semester, self.total_semesters_remaining + 1):
+            internship = next((c for c in ('ENGR399', 'ENGR399(2)') if c in self.remaining_courses and c not in plan and ready(c, s)), None)
+            if internship:
+                plan[internship] = s
+                credits += self.courses[internship].credits
+                continue
+            if s % 3 == 0:
+                continue
+            left = sum(self.courses[c].credits for c in self.remaining_courses if c not in plan)
+            regular_left = sum(1 for t in range(s, self.total_semesters_remaining + 1) if t % 3 != 0)
+            cap = min(self.max_credits, max(self.min_credits, -(-left // regular_left)))
+            load = 0
+            for course in order:
+                if course in plan or course in ('ENGR399', 'ENGR399(2)') or not ready(course, s):
+                    continue
+                if load + self.courses[course].credits <= cap:
+                    plan[course] = s
+                    load += self.courses[course].credits
+            credits += load
+
+        # the last semesters can end up under the min load, so pull courses forward into them while
+        # the semesters they leave stay above it. a course moved later counts for the credits of the
+        # semesters in between one semester less, so their min_credits courses have to still make it
+        loads = {s: 0 for s in range(self.starting_semester, self.total_semesters_remaining + 1)}
+        for course, s in plan.items():
+            loads[s] += self.courses[course].credits
+        done = sum(self.courses[c].credits for c in self.completed_courses if c in self.courses)
+        needs_min = lambda s: s % 3 != 0 and s <= 12 and loads[s] > 0
+        credits_before = lambda s: done + sum(load for t, load in loads.items() if t < s)
+        for target in sorted(loads, reverse=True):
+            for course in sorted(plan, key=plan.get, reverse=True):
+                if not needs_min(target) or loads[target] >= self.min_credits:
+                    break
+                source = plan[course]
+                size = self.courses[course].credits
+                if (source >= target or course in ('ENGR399', 'ENGR399(2)') or target not in windows[course]
+                        or loads[target] + size > self.max_credits or (needs_min(source) and loads[source] - size < self.min_credits)
+                        or any(plan.get(d, target + 1) <= target for d in self.remaining_courses if course in self.courses[d].prerequisites)
+                        or any(credits_before(s) - size < self.courses[c].min_credits for c, s in plan.items()
+                               if source < s <= target and self.courses[c].min_credits is not None)):
+                    continue
+                plan[course] = target
+                loads[source] -= size
+                loads[target] += size
+        return plan
+
+    def shortest_horizon(self, minimum=None):
+        # the first semester count (up to the scheduler's) where every course still fits somewhere and the
+        # remaining credits fit between the min and max loads. starts looking at minimum if given, and goes
+        # shorter only if nothing from minimum on can work. None if nothing can.
+        return next(self.candidate_horizons(minimum), None)
+
+    def candidate_horizons(self, minimum=None):
+        # every semester count that passes the checks of shortest_horizon, in the order it looks at them.
+        # they are cheap checks, so a horizon can pass them and still have no plan (the min loads and the
+        # prereq chains together), solve_plan goes on to the next one then
+        limit = self.total_semesters_remaining
+        remaining_credits = sum(self.courses[c].credits for c in self.remaining_courses)
+
+        def can_work(horizon):
+            sems = range(self.starting_semester, horizon + 1)
+            most = sum(6 if s % 3 == 0 else self.max_credits for s in sems)
+            least = sum(self.min_credits for s in sems if s % 3 != 0 and s <= 12)
+            if not least <= remaining_credits <= most:
+                return False
+            self.total_semesters_remaining = horizon
+            try:
+                return all(self.semester_windows().values())
+            finally:
+                self.total_semesters_remaining = limit
+
+        start = max(self.starting_semester, minimum or self.starting_semester)
+        for horizon in range(start, limit + 1):
+            if can_work(horizon):
+                yield horizon
+        for horizon in range(min(start, limit + 1) - 1, self.starting_semester - 1, -1):
+            if can_work(horizon):
+                yield horizon
+
+    def is_available(self, course, s):
+        offered = self.courses[course].available_in
+        return offered is None or self.term_of_semester(s) in offered
+
+    @staticmethod
+    def term_of_semester(s):
+        return ('summer', 'fall', 'spring')[s % 3]
+
     
     @staticmethod
     def is_depndent(start_course, target_course, courses):
+        # whether target_course is a prereq of start_course, directly or not, by searching from it. the
+        # scheduler itself reads prerequisites.all_dependents, this stays as the public one pair check
+        # (and the tests check the compiled closure against it)
         visited = set()
         stack = [start_course]
     
@@ -298,16 +1043,13 @@ class CourseScheduler:
         return False
 
     def get_all_dependents(self, target_course):
-        dependents= set()
-        for course in self.courses:
-            if self.is_depndent(course, target_course, self.courses):
-                dependents.add(course)
-        return dependents
+        # from the closure compiled once per prereq graph (see prerequisites.dependents_closure)
+        # instead of a search from every course
+        return {course for course in all_dependents(self.courses, target_course) if course in self.courses}
     def assign_importance(self):
-
-        for course in self.courses:
-            dependents = self.get_all_dependents(course)
-            self.courses[course]['importance'] = len(dependents)+1
+        # the records are shared, so the ones with the importance set are new records (see registry.py)
+        importance = course_importance(self.courses)
+        self.courses = REGISTRY.major(self.courses, overlay={course: {'importance': importance[course]} for course in self.courses})
 
 
     @staticmethod
@@ -324,41 +1066,121 @@ class CourseScheduler:
     
     @staticmethod
     def convert_to_set(str):
-        def to_minutes(t):
-            mins_diff=0
-            if ':' in t:
-                hour, minute = map(int, t.split(':'))
-            else:
-                hour, minute = int(t), 0
-            if hour >= 9:
-                mins_diff+= (hour-9)  * 60 
-            else:
-                mins_diff+= 180+ hour*60
-            mins_diff+= minute
-            return mins_diff
+        # kept for callers that want the slots themselves, the hot path uses convert_to_mask
+        mask = CourseScheduler.convert_to_mask(str)
+        time_set = set()
+        slot = 0
+        while mask:
+            if mask & 1:
+                time_set.add(slot)
+            mask >>= 1
+            slot += 1
+        return time_set
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def convert_to_mask(str):
+        # one bit per 15 min slot, same numbering as convert_to_set (48 slots a day starting 9am)
         days, start, end = CourseScheduler.parse_time(str)
-        start_min = to_minutes(start)
-        end_min = to_minutes(end)
-    
-        start_point= start_min//15
-        end_point= end_min//15
-        
-        time_set= set()
-        dic=  {'M': 0, 'T': 48, 'W': 96, 'H': 144} 
+        start_point = CourseScheduler.to_minutes(start) // 15
+        end_point = CourseScheduler.to_minutes(end) // 15
+        if end_point <= start_point:
+            return 0
+        day_bits = ((1 << (end_point - start_point)) - 1) << start_point
+        mask = 0
         for i in days:
-            for j in  range(start_point, end_point):
-                time_set.add(dic[i] + j)
-        return time_set
+            mask |= day_bits << SLOT_OFFSETS[i]
+        return mask
 
     
     @staticmethod    
     def does_conflict(t1, t2):
-        return not CourseScheduler.convert_to_set(t1).isdisjoint(CourseScheduler.convert_to_set(t2))
+        return (CourseScheduler.convert_to_mask(t1) & CourseScheduler.convert_to_mask(t2)) != 0
+
+    def section_index(self, course):
+        # {section key: (section entry, is lab)} for a course, built once so lookups dont scan the lists
+        index = self._section_index.get(course)
+        if index is None:
+            index = {}
+            sections = self.courses[course].get('sections', ['default'])
+            if isinstance(sections, dict):
+                for key, info in sections.items():
+                    index[key] = (info, False)
+            else:
+                for entry in sections:
+                    index[self.section_key(entry)] = (entry, False)
+            for entry in self.courses[course].get('labs', []):
+                index[self.section_key(entry)] = (entry, True)
+            self._section_index[course] = index
+        return index
+
+    @staticmethod
+    def section_key(section):
+        # sections are either a time string like 'MW9-11' or a dict with a 'section' id (e.g. a CRN)
+        return section['section'] if isinstance(section, dict) else section
+
+    @staticmethod
+    def section_mask(section):
+        if not isinstance(section, dict):
+            return CourseScheduler.convert_to_mask(section)
+        if 'mask' in section:
+            return section['mask']
+        mask = 0
+        for time in section.get('times') or [section.get('time')]:
+            if time:
+                mask |= CourseScheduler.convert_to_mask(time)
+        return mask
+
+    @staticmethod
+    def mask_intervals(mask):
+        # split a slot mask back into (day, start slot, end slot) runs, end is exclusive
+        intervals = []
+        for day, offset in SLOT_OFFSETS.items():
+            bits = (mask >> offset) & DAY_MASK
+            while bits:
+                start = (bits & -bits).bit_length() - 1
+                run = bits >> start
+                length = (~run & (run + 1)).bit_length() - 1
+                intervals.append((day, start, start + length))
+                bits &= ~(((1 << length) - 1) << start)
+        return intervals
+
+    @staticmethod
+    def conflict_cliques(masks):
+        # sweep every day from morning to night keeping the sections that are still running.
+        # each time new sections start, the running ones all overlap each other so they form a group.
+        # masks is {key: slot mask}, returns a list of tuples of keys with 2 or more overlapping entries
+        by_day = {}
+        for key, mask in masks.items():
+            for day, start, end in CourseScheduler.mask_intervals(mask):
+                by_day.setdefault(day, []).append((start, end, key))
+
+        found = set()
+        for intervals in by_day.values():
+            intervals.sort(key=lambda interval: interval[0])
+            active = []
+            i = 0
+            while i < len(intervals):
+                start = intervals[i][0]
+                active = [(end, key) for end, key in active if end > start]
+                while i < len(intervals) and intervals[i][0] == start:
+                    active.append((intervals[i][1], intervals[i][2]))
+                    i += 1
+                if len(active) > 1:
+                    found.add(frozenset(key for _, key in active))
+
+        # drop groups that are already covered by a bigger one
+        cliques = []
+        for group in sorted(found, key=len, reverse=True):
+            if not any(group <= kept for kept in cliques):
+                cliques.append(group)
+        return [tuple(sorted(group, key=str)) for group in cliques]
 
     @staticmethod
     def year_of_semester(s):
         return int((s-1) // 3 + 1 )
     
+    @staticmethod
     def to_minutes(t):
             mins_diff=0
             if ':' in t:
@@ -376,7 +1198,7 @@ class CourseScheduler:
 
     def get_full_solution(self):
         if not hasattr(self, 'model3') or self.model3 is None or self.model3.Status != GRB.OPTIMAL:
-            print("Model3 is not solved or not optimal.")
+            log.info("model3 is not solved or not optimal")
             return
     
         semester_courses = {s: [] for s in range(1, self.total_semesters_remaining + 1)}
@@ -387,7 +1209,7 @@ class CourseScheduler:
         for (course, s), var in self.y.items():
             if var.X > 0.5:  # course is taken in semester s
                 semester_courses[s].append(course)
-                semester_credits[s] += self.courses[course]['credits']
+                semester_credits[s] += self.courses[course].credits
     
         # Print results
         for s in range(1, self.total_semesters_remaining + 1):
@@ -397,7 +1219,7 @@ class CourseScheduler:
             course_names = [self.courses[c]['name'] for c in courses]
             sem_credits = semester_credits[s]
             cumulative_credits += sem_credits
-            print(f"Semester {s}: {', '.join(course_names)} | Credits = {sem_credits} \n\n")
+            log.info("semester %s: %s | credits = %s", s, ', '.join(course_names), sem_credits)
         semesters = list(range(self.starting_semester, self.total_semesters_remaining + 1))  
 
         
@@ -428,9 +1250,35 @@ class CourseScheduler:
 
         
       
-        print(f"Importance Term Value: {importance_term}")
-        print(f"Penalty Term Value: {penalty_term}")
-        print(f"Workload Variance Term Value: {workload_term}")
-        print(f"avg load : {avg_weight}")
-        print(f"Fifth year pen Value: {value}")
+        log.info("importance term %s, penalty term %s, workload variance term %s, avg load %s, fifth year penalty %s",
+                 importance_term, penalty_term, workload_term, avg_weight, value)
+
+
+
+def relative_gap(objective, bound):
+    # the same gap as gurobi's MIPGap, None while there is no bound yet
+    if abs(bound) >= 1e100:
+        return None
+    if objective == bound:
+        return 0.0
+    return abs(objective - bound) / abs(objective) if objective else None
+
+# plan templates built so far in this process, see CourseScheduler.build_model3_from_template
+plan_templates = {}
+plan_template_locks = {} # template key -> lock for building and copying that template
+plan_templates_lock = threading.Lock() # for plan_template_locks
 
+class PlanTemplate:
+    # build_model3 for a student with nothing completed yet, built once and copied for every student
+    # with the same major, horizon, starting semester and options. keeps the positions of the variables and
+    # of the constraints that depend on the completed courses, so they can be found again in a copy.
+    # the model is on an environment from ENV_POOL kept for this template, only used under its lock
+    def __init__(self, courses, required, max=18, min=12, semesters=15, starting=1, **options):
+        self.env = ENV_POOL.acquire()
+        scheduler = CourseScheduler(courses, [], required, max=max, min=min, semesters=semesters, starting=starting, env=self.env)
+        self.model = scheduler.build_model3(**options)
+        self.model.update()
+        self.y = {key: var.index for key, var in scheduler.y.items()}
+        self.take_once = {course: constr.index for course, constr in scheduler.constrs3['take once'].items()}
+        self.prereq = {pair: [constr.index for constr in group] for pair, group in scheduler.constrs3['prereq'].items()}
+        self.restricted = {key: constr.index for key, constr in scheduler.constrs3['restricted'].items()}
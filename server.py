@@ -1,14 +1,29 @@
 from flask import redirect, url_for
-from flask import Flask, jsonify, render_template, request
+from flask import Flask, Response, jsonify, render_template, request, stream_with_context
 from scheduler import CourseScheduler
+from gurobi_env import ENV_POOL
+from metrics import instrument
+from plan_api import PLAN_OPTIONS, PLAN_TIME_LIMIT, get_jobs, get_plan_cache, plan_api, plan_semesters, timetable_entries
+from jobs import NO_PLAN, plan_error, read_students
+from prerequisites import normalize_completed, parse_codes
 from scheduler_data import plans, time_data
 #import io
 #import sys
-import gurobipy as gp
-from gurobipy import GRB
+import json
+import logging
+import os
 
 app = Flask(__name__)
 
+# the scheduler and solver logs go to stderr (see gurobi_env.py), SCHEDULER_LOG_LEVEL=DEBUG for the whole gurobi log
+logging.basicConfig(format='%(asctime)s %(name)s %(levelname)s %(message)s')
+logging.getLogger('scheduler').setLevel(os.environ.get('SCHEDULER_LOG_LEVEL', 'INFO'))
+
+# /api/plan, /api/timetable, the job events, /plan/stream and /next_semester/options, see plan_api.py
+app.register_blueprint(plan_api)
+# request, template, solver and cache metrics on /metrics, see metrics.py
+instrument(app)
+
 @app.route('/', methods=['GET', 'POST'])
 def home():
     plan = []
@@ -20,9 +35,11 @@ def home():
         completed_raw = request.form['completed']
         completed_semesters = int(request.form['completed_semesters'])
 
-        completed_set = set(code.strip() for code in completed_raw.split(',') if code.strip())
         courses = plans[major_index]
-        print(completed_set)
+        # codes outside the major are dropped and the prereqs of completed courses count as completed,
+        # so equivalent histories give the same plan (and hit the same cache entry)
+        completed_set = set(normalize_completed(courses, parse_codes(completed_raw)))
+        app.logger.debug("completed %s", sorted(completed_set))
 
 
         scheduler = CourseScheduler(
@@ -31,36 +48,30 @@ def home():
             required=set(courses.keys()),
             max=180,
             min=12,
-            semesters=12,  
-            starting=completed_semesters + 1
+            semesters=15,  
+            starting=completed_semesters + 1,
+            pool=ENV_POOL
         )
 
-        model = scheduler.build_model3(alpha=0, beta=0, gamma=80, delta=30)
-        model.optimize()
-        scheduler.get_full_solution()
+        try:
+            # requests that can't work are explained from the prereq graph and credit bounds before any
+            # model is built. then repeats come from the plan cache, small plans are searched in process and
+            # the rest go to gurobi with the model copied from a template built once per major instead of
+            # being rebuilt every time. gives up after PLAN_TIME_LIMIT seconds with the best plan found by then
+            error = plan_error(scheduler, PLAN_OPTIONS['min_horizon'])
+            solved = {}
+            if error is None:
+                solved = scheduler.solve_plan(template=major_index, time_limit=PLAN_TIME_LIMIT, cache=get_plan_cache(), **PLAN_OPTIONS)
+                if solved is None:
+                    error = NO_PLAN
+                    solved = {}
+            if scheduler.model3 is not None:
+                scheduler.get_full_solution()
+        finally:
+            scheduler.dispose()
         # for output
-        result_dict = {}
-        for (course, sem), var in scheduler.y.items():
-            if var.X > 0.5:
-                result_dict.setdefault(sem, []).append(course)
-                if sem == completed_semesters + 1:
-                    first_semester_courses.append(course)
-        # Transform plan to structured format for frontend
-        plan = []
-        for sem, course_codes in sorted(result_dict.items()):
-            semester_courses = []
-            for code in course_codes:
-                course_info = courses.get(code, {})
-                semester_courses.append({
-                    "code": code,
-                    "name": course_info.get("name", code),
-                    "credits": course_info.get("credits", 0)
-                })
-            plan.append({
-                "number": sem,
-                "credits": sum(c["credits"] for c in semester_courses),
-                "courses": semester_courses
-            })
+        first_semester_courses = [course for course, sem in solved.items() if sem == completed_semesters + 1]
+        plan = plan_semesters(courses, solved)
         # Calculate stats for the plan
         total_semesters = len(plan)
         total_courses = sum(len(sem['courses']) for sem in plan)
@@ -70,6 +81,7 @@ def home():
         return render_template(
             'plan.html',
             plan=plan,
+            error=error,
             total_semesters=total_semesters,
             total_courses=total_courses,
             total_credits=total_credits,
@@ -81,6 +93,8 @@ def home():
         )
 
     return render_template('index.html')
+
+
 @app.route('/next_semester', methods=['POST'])
 def next_semester():
     major_index = int(request.form['major'])
@@ -94,61 +108,16 @@ def next_semester():
     scheduler = CourseScheduler(
         courses=time_data,  # Use time_data for sections/times
         completed=completed_set,
-        required=set(courses.keys())
+        required=set(courses.keys()),
+        pool=ENV_POOL
     )
-    desired_courses = list(time_data.keys())
-    scheduler.build_model2(desired_courses=desired_courses)
-    scheduler.model2.optimize()
-
-    # Gather schedule info for visualization
-    timetable_courses = []
-    # Assign a color per course for timetable
-    import random
-    color_palette = ['#3182ce', '#38a169', '#e53e3e', '#d69e2e', '#805ad5', '#319795', '#f56565', '#ed8936', '#ecc94b', '#48bb78', '#4299e1', '#9f7aea']
-    course_colors = {}
-    for idx, course in enumerate(time_data.keys()):
-        course_colors[course] = color_palette[idx % len(color_palette)]
-
-    for (course, section), var in scheduler.x2.items():
-        if var.X > 0.5:
-            cinfo = scheduler.courses[course]
-            secinfo = {}
-            # Check if this section is a lecture or a lab
-            is_lab = False
-            if 'labs' in cinfo and section in cinfo['labs']:
-                is_lab = True
-            # Find the section info
-            if is_lab:
-                secinfo = {'name': section}
-            elif 'sections' in cinfo:
-                sections = cinfo['sections']
-                if isinstance(sections, dict):
-                    secinfo = sections.get(section, {})
-                elif isinstance(sections, list):
-                    for s in sections:
-                        if isinstance(s, dict):
-                            if (s.get('name') == section) or (s.get('section') == section):
-                                secinfo = s
-                                break
-                        elif isinstance(s, str):
-                            if s == section:
-                                secinfo = {'name': s}
-                                break
-            raw_time = secinfo.get('time')
-            if not raw_time:
-                raw_time = secinfo.get('name', '')
-            days, start, end = CourseScheduler.parse_time(raw_time) if raw_time else ([], '', '')
-            timetable_courses.append({
-                'code': course,
-                'name': cinfo.get('name', course),
-                'section': section,
-                'days': days,  
-                'start': start,  
-                'end': end,      
-                'room': secinfo.get('room', ''),
-                'color': course_colors[course],
-                'raw_time': raw_time,
-            })
+    try:
+        desired_courses = list(time_data.keys())
+        chosen = scheduler.solve_timetable(desired_courses) or []
+
+        timetable_courses = timetable_entries(scheduler, chosen)
+    finally:
+        scheduler.dispose()
 
 
     # Count labs actually scheduled in this semester (from timetable_courses)
@@ -158,13 +127,6 @@ def next_semester():
             lab_count += 1
             
 
-    # Add 'length' field to each timetable_courses entry using to_minutes
-    for entry in timetable_courses:
-        start = entry.get('start', '')
-        end = entry.get('end', '')
-        length = CourseScheduler.to_minutes(end) - CourseScheduler.to_minutes(start)
-        entry['length'] = length
-
     return render_template(
         'schedule.html',
         timetable_courses=timetable_courses,
@@ -175,6 +137,30 @@ def next_semester():
     )
 
 
+@app.route('/api/jobs', methods=['POST'])
+def submit_jobs():
+    # one student ({major, completed, completed_semesters}) or {'students': [...]} for many, answered
+    # right away with the job ids to poll at /api/jobs/<id> or follow at /api/jobs/<id>/events
+    data = request.get_json(silent=True) or request.form.to_dict()
+    try:
+        students = read_students(data)
+    except ValueError as error:
+        return jsonify({'error': str(error)}), 400
+    jobs = get_jobs()
+    ids = jobs.submit_many(students)
+    if 'students' in data:
+        return jsonify({'jobs': ids}), 202
+    return jsonify(jobs.get(ids[0]).to_dict()), 202
+
+
+@app.route('/api/jobs/<job_id>')
+def job_status(job_id):
+    job = get_jobs().get(job_id)
+    if job is None:
+        return jsonify({'error': 'job not found'}), 404
+    return jsonify(job.to_dict())
+
+
 @app.route('/get_courses')
 def get_courses():
     major = int(request.args.get('major', 0))
@@ -0,0 +1,188 @@
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+import json
+
+# Add the current directory to the path so we can import catalog
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from catalog import Catalog, SeatPolicy, SectionIndex, available_sections, available_time_data, banner_pages, banner_time, build_time_data, iter_sections, load_catalog, load_time_data
+from scheduler import CourseScheduler
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'courses_fall25')
+
+
+class TestBannerCatalog(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.sections = list(iter_sections(banner_pages(DATA_DIR), workers=1))
+
+    def test_banner_time(self):
+        """Test conversion of Banner times to the scheduler time format."""
+        self.assertEqual(banner_time('0900', '1015', 'TH'), 'TH9-10:15')
+        self.assertEqual(banner_time('1200', '1315', 'MW'), 'MW12-1:15')
+        self.assertEqual(banner_time('1630', '1745', 'M'), 'M4:30-5:45')
+        self.assertEqual(CourseScheduler.to_minutes(banner_time('1930', '2100', 'T').split('-')[1]), 12 * 60)
+        for begin, end in [('0800', '0915'), ('2030', '2130'), ('2100', '2200'), ('1000', '0950')]:
+            with self.assertRaises(ValueError):
+                banner_time(begin, end, 'M')
+
+    def test_skips_sections_outside_time_slots(self):
+        """Test that a section meeting outside 9am-9pm is left out instead of landing on the wrong slots."""
+        with open(banner_pages(DATA_DIR)[0]) as f:
+            record = next(r for r in json.load(f)['data'] if r.get('meetingsFaculty'))
+        late = json.loads(json.dumps(record))
+        late['courseReferenceNumber'] = 'LATE'
+        for meeting in late['meetingsFaculty']:
+            meeting['meetingTime'].update(beginTime='2130', endTime='2245', monday=True)
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        with open(os.path.join(tmp, 'searchResults1.json'), 'w') as f:
+            json.dump({'data': [record, late]}, f)
+        with self.assertLogs('scheduler.catalog', 'WARNING'):
+            sections = list(iter_sections(banner_pages(tmp), workers=1))
+        self.assertEqual([section.crn for section in sections], [record['courseReferenceNumber']])
+
+    def test_read_sections(self):
+        """Test that every record in the dumps becomes a section."""
+        self.assertEqual(len(self.sections), 1179)
+        aero = next(s for s in self.sections if s.crn == '10203')
+        self.assertEqual(aero.subject_course, 'AERO200')
+        self.assertEqual(aero.times, ('TH9-10:15',))
+        self.assertEqual(aero.mask, CourseScheduler.convert_to_mask('TH9-10:15'))
+        self.assertEqual(aero.seats_available, 0)
+        self.assertEqual(aero.cross_list, 'AA1')
+
+    def test_parallel_matches_serial(self):
+        """Test that reading the pages in worker processes gives the same sections."""
+        parallel = list(iter_sections(banner_pages(DATA_DIR), workers=2))
+        self.assertEqual(sorted(parallel), sorted(self.sections))
+
+    def test_build_time_data(self):
+        """Test grouping sections into courses with lectures and labs."""
+        courses = build_time_data(self.sections)
+        cosc114 = courses['COSC114']
+        self.assertEqual(cosc114['credits'], 4)
+        self.assertEqual(len(cosc114['sections']), 10)
+        self.assertEqual(len(cosc114['labs']), 16)
+        self.assertEqual(courses, load_time_data(DATA_DIR, workers=1))
+        # already records, so a scheduler uses them as they are
+        self.assertIs(CourseScheduler(courses=courses, completed=[], required=[]).courses, courses)
+
+    def test_time_data_feeds_scheduler(self):
+        """Test that the Banner courses can be scheduled directly."""
+        courses = build_time_data(self.sections)
+        scheduler = CourseScheduler(courses=courses, completed=[], required=[])
+        chosen = scheduler.solve_timetable(['COSC114', 'MATH111', 'ENGL101'], backend='search')
+        masks = {}
+        for course, crn in chosen:
+            entries = courses[course]['sections'] + courses[course].get('labs', ())
+            masks[crn] = next(e['mask'] for e in entries if e['section'] == crn)
+        combined = 0
+        for mask in masks.values():
+            self.assertFalse(combined & mask)
+            combined |= mask
+
+
+class TestSectionIndex(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.index = SectionIndex(iter_sections(banner_pages(DATA_DIR), workers=1))
+
+    def test_lookup_by_crn_and_course(self):
+        """Test direct lookups by CRN and subject course."""
+        self.assertEqual(self.index.section('10203').subject_course, 'AERO200')
+        self.assertEqual(len(self.index.course_sections('COSC114')), 26)
+        self.assertEqual(len(self.index.course_sections('COSC114', 'Lab')), 16)
+        self.assertEqual(self.index.course_sections('NOPE999'), [])
+
+    def test_groups(self):
+        """Test the cross list and link groups."""
+        self.assertEqual([s.crn for s in self.index.cross_listed('10203')], ['10166'])
+        self.assertEqual(self.index.cross_listed('10630'), [])
+        lectures = self.index.link_group('10630')
+        self.assertEqual(len(lectures), 9)
+        self.assertTrue(all(s.link == 'L1' for s in lectures))
+
+    def test_cross_list_seats(self):
+        """Test that cross listed sections use the shared availability."""
+        section = self.index.section('10203')
+        self.assertEqual(self.index.seats('10203'), min(section.seats_available, section.cross_list_available))
+
+
+class TestCompiledCatalog(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.cache_path = os.path.join(self.tmp, 'catalog.bin')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_round_trip(self):
+        """Test that the compiled catalog gives back the parsed sections."""
+        catalog = load_catalog(DATA_DIR, cache_path=self.cache_path, workers=1)
+        sections = list(iter_sections(banner_pages(DATA_DIR), workers=1))
+        self.assertEqual(len(catalog), len(sections))
+        self.assertEqual(sorted(catalog), sorted(sections))
+        # the file it was written to first was moved into place
+        self.assertEqual(os.listdir(self.tmp), ['catalog.bin'])
+
+    def test_reused_until_sources_change(self):
+        """Test that the cache file is only rebuilt when the pages change."""
+        pages = os.path.join(self.tmp, 'pages')
+        os.mkdir(pages)
+        for path in banner_pages(DATA_DIR)[:2]:
+            shutil.copy(path, pages)
+        first = load_catalog(pages, cache_path=self.cache_path, workers=1)
+        mtime = os.path.getmtime(self.cache_path)
+
+        second = load_catalog(pages, cache_path=self.cache_path, workers=1)
+        self.assertEqual(os.path.getmtime(self.cache_path), mtime)
+        self.assertEqual(second.digest, first.digest)
+
+        os.remove(banner_pages(pages)[0])
+        third = load_catalog(pages, cache_path=self.cache_path, workers=1)
+        self.assertNotEqual(third.digest, first.digest)
+        self.assertLess(len(third), len(first))
+
+    def test_seat_filter(self):
+        """Test the vectorized seat filter against a plain loop."""
+        catalog = load_catalog(DATA_DIR, cache_path=self.cache_path, workers=1)
+
+        def seats(s):
+            return min(s.seats_available, s.cross_list_available) if s.cross_list else s.seats_available
+
+        keep = available_sections(catalog)
+        expected = [s.open_section and seats(s) >= 1 for s in catalog]
+        self.assertEqual(list(keep), expected)
+
+        with_waitlist = available_sections(catalog, SeatPolicy(allow_waitlist=True))
+        self.assertGreater(with_waitlist.sum(), keep.sum())
+        self.assertFalse((keep & ~with_waitlist).any())
+
+        # Every section in the dumps is flagged restricted
+        self.assertFalse(available_sections(catalog, SeatPolicy(allow_restricted=False)).any())
+
+    def test_available_time_data(self):
+        """Test that full sections never reach the scheduler."""
+        courses = available_time_data(DATA_DIR, cache_path=self.cache_path)
+        full = {s.crn for s in iter_sections(banner_pages(DATA_DIR), workers=1) if s.seats_available <= 0}
+        for course in courses.values():
+            for entry in course['sections'] + course.get('labs', ()):
+                self.assertNotIn(entry['section'], full)
+
+    def test_rejects_other_files(self):
+        """Test that a file that isn't a compiled catalog is refused."""
+        with open(self.cache_path, 'wb') as f:
+            f.write(b'x' * 64)
+        with self.assertRaises(ValueError):
+            Catalog(self.cache_path)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
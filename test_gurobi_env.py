@@ -0,0 +1,75 @@
+import unittest
+import sys
+import os
+
+# Add the current directory to the path so we can import gurobi_env
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from gurobi_env import EnvPool, log
+from scheduler import CourseScheduler
+from scheduler_data import cs_courses, time_data
+
+PLAN_OPTIONS = dict(backend='gurobi', alpha=0, beta=0, gamma=80, delta=30, windows=True, min_horizon=12)
+
+
+class TestEnvPool(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = EnvPool()
+
+    def tearDown(self):
+        self.pool.close()
+
+    def test_reuses_environments(self):
+        """Test that a released environment is handed out again instead of starting another."""
+        with self.pool.env() as first:
+            with self.pool.env() as second:
+                self.assertIsNot(first, second)
+        with self.pool.env() as again:
+            self.assertIn(again, (first, second))
+        self.assertEqual(self.pool.started, 2)
+
+    def test_solve_on_pooled_environment(self):
+        """Test solving on a pooled environment, logging the summary and disposing the model."""
+        with self.pool.env() as env:
+            scheduler = CourseScheduler(courses=cs_courses, completed=['ENGL101', 'GENS101'], required=cs_courses.keys(),
+                                        max=180, min=12, semesters=15, starting=2, env=env)
+            with self.assertLogs(log, 'INFO') as logs:
+                plan = scheduler.solve_plan(**PLAN_OPTIONS)
+            self.assertIsNotNone(plan)
+            self.assertTrue(any('FullPlanScheduler: status 2' in line for line in logs.output))
+            # nothing of the gurobi log below INFO
+            self.assertFalse(any(line.startswith('DEBUG') for line in logs.output))
+            self.assertEqual(scheduler.model3.getParamInfo('OutputFlag')[2], 0)
+
+            scheduler.dispose()
+            self.assertIsNone(scheduler.model3)
+            self.assertEqual(scheduler.plan, plan)
+
+    def test_pool_only_used_by_gurobi(self):
+        """Test that a scheduler given the pool takes an environment for a model only, and gives it back on dispose."""
+        scheduler = CourseScheduler(courses=time_data, completed=[], required=[], pool=self.pool)
+        self.assertIsNotNone(scheduler.solve_timetable(list(time_data), backend='search'))
+        scheduler.dispose()
+        self.assertEqual(self.pool.started, 0)
+
+        scheduler.solve_timetable(list(time_data), backend='gurobi')
+        self.assertIsNotNone(scheduler.env)
+        self.assertEqual(self.pool.started, 1)
+        scheduler.dispose()
+        self.assertIsNone(scheduler.env)
+        self.assertEqual(len(self.pool.free), 1)
+
+    def test_debug_log(self):
+        """Test that the solver log goes to the logger at DEBUG."""
+        with self.pool.env() as env:
+            scheduler = CourseScheduler(courses=cs_courses, completed=['ENGL101', 'GENS101'], required=cs_courses.keys(),
+                                        max=180, min=12, semesters=15, starting=2, env=env)
+            with self.assertLogs(log, 'DEBUG') as logs:
+                scheduler.solve_plan(**PLAN_OPTIONS)
+            scheduler.dispose()
+        self.assertTrue(any(line.startswith('DEBUG') and 'Optimize a model' in line for line in logs.output))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,98 @@
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+# Add the current directory to the path so we can import jobs
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from jobs import JobQueue, read_students, solve_student
+from metrics import PHASE_SECONDS, SOLVER_SECONDS
+from scheduler_data import cs_courses
+
+PLAN_OPTIONS = dict(alpha=0, beta=0, gamma=80, delta=30, windows=True, min_horizon=12)
+LIMITS = dict(max=180, min=12, semesters=15)
+
+
+class TestJobs(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.queue = JobQueue(workers=2, limits=LIMITS, options=PLAN_OPTIONS, time_limit=30,
+                              cache_path=os.path.join(self.tmp, 'plans.db'))
+
+    def tearDown(self):
+        self.queue.shutdown()
+        shutil.rmtree(self.tmp)
+
+    def test_read_students(self):
+        """Test reading one student or a bulk submission."""
+        self.assertEqual(read_students({'major': '0', 'completed': 'engl101, GENS101', 'completed_semesters': '1'}),
+                         [{'major': 0, 'completed': {'ENGL101', 'GENS101'}, 'completed_semesters': 1}])
+        bulk = read_students({'students': [{'major': 1, 'completed': ['MATH111']}, {'major': 0}]})
+        self.assertEqual([s['major'] for s in bulk], [1, 0])
+        # codes in a list are cleaned up like the ones in a string
+        self.assertEqual(read_students({'major': 0, 'completed': ['engl101', ' MATH 111']})[0]['completed'], {'ENGL101', 'MATH111'})
+        for bad in [{'students': []}, {'major': 7}, {'completed': 'ENGL101'}, {'students': ['x']},
+                    {'major': 0, 'completed_semesters': -3}, {'major': 0, 'completed': [['ENGL101']]},
+                    {'major': 0, 'completed': [{'code': 'ENGL101'}]}, {'major': 0, 'completed': 5}]:
+            with self.assertRaises(ValueError):
+                read_students(bad)
+
+    def test_solve_student(self):
+        """Test one job in process, including one that can't work."""
+        result = solve_student(0, ('ENGL101', 'GENS101'), 2, LIMITS, PLAN_OPTIONS)
+        self.assertTrue(result['found'])
+        self.assertEqual(set(result['plan']), set(cs_courses) - {'ENGL101', 'GENS101'})
+
+        late = solve_student(0, (), 10, LIMITS, PLAN_OPTIONS)
+        self.assertFalse(late['found'])
+        self.assertIn('more semesters', late['error'])
+
+    def test_equivalent_students_share_a_solve(self):
+        """Test that bulk students with the same history share one solve in the pool."""
+        ids = self.queue.submit_many(read_students({'students': [
+            {'major': 0, 'completed': 'ENGL102', 'completed_semesters': 1},
+            {'major': 0, 'completed': 'ENGL101, ENGL102', 'completed_semesters': 1},
+            {'major': 0, 'completed': 'ENGL102', 'completed_semesters': 2},
+        ]}))
+        jobs = [self.queue.get(job_id) for job_id in ids]
+        self.assertEqual(len(set(ids)), 3)
+        self.assertIs(jobs[0].future, jobs[1].future)
+        self.assertIsNot(jobs[0].future, jobs[2].future)
+
+        results = [job.result(timeout=120) for job in jobs]
+        self.assertEqual([job.status for job in jobs], ['done'] * 3)
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(min(results[2]['plan'].values()), 3)
+        self.assertEqual(self.queue.solves, {})
+        self.assertEqual(jobs[0].to_dict()['result'], results[0])
+        self.assertIsNone(self.queue.get('nope'))
+
+    def test_pool_restarts_after_worker_dies(self):
+        """Test that jobs still run after a worker process died and broke the pool."""
+        dead = self.queue.pool().submit(os._exit, 1)
+        with self.assertRaises(BrokenProcessPool):
+            dead.result(timeout=60)
+        job = self.queue.get(self.queue.submit(0, {'ENGL101', 'GENS101'}, 1))
+        self.assertTrue(job.result(timeout=120)['found'])
+
+    def test_worker_metrics_reach_the_server(self):
+        """Test that what a worker counts for a job is added to the metrics of the process that queued it."""
+        solves = SOLVER_SECONDS.count(model='model3')
+        builds = PHASE_SECONDS.count(model='model3', phase='constraints')
+        job = self.queue.get(self.queue.submit(0, {'ENGL101', 'MATH111'}, 2))
+        self.assertTrue(job.result(timeout=120)['found'])
+        # the counts are merged by the future's callback, which can run just after result() returns
+        deadline = time.monotonic() + 10
+        while SOLVER_SECONDS.count(model='model3') == solves and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(SOLVER_SECONDS.count(model='model3'), solves + 1)
+        self.assertGreater(PHASE_SECONDS.count(model='model3', phase='constraints'), builds)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
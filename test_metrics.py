@@ -0,0 +1,113 @@
+import unittest
+import sys
+import os
+
+# Add the current directory to the path so we can import metrics
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask, render_template_string
+import metrics
+from metrics import CACHE_REQUESTS, MODEL_SIZE, PHASE_SECONDS, SOLVER_SECONDS, SOLVES, Counter, Histogram, instrument
+from plan_cache import PlanCache
+from scheduler import CourseScheduler
+from scheduler_data import cs_courses
+
+PLAN_OPTIONS = dict(backend='gurobi', alpha=0, beta=0, gamma=80, delta=30, windows=True, min_horizon=12)
+
+
+class TestMetrics(unittest.TestCase):
+
+    def tearDown(self):
+        # the metrics made here shouldn't show up in the other tests' renders
+        metrics._metrics[:] = [metric for metric in metrics._metrics if metric.name != 'test_seconds' and metric.name != 'test_total']
+
+    def test_render_histogram_and_counter(self):
+        """Test the Prometheus text of a histogram and a counter with labels."""
+        histogram = Histogram('test_seconds', 'Test timings.', ['phase'], buckets=(0.1, 1))
+        histogram.observe(0.05, phase='build')
+        histogram.observe(0.5, phase='build')
+        histogram.observe(5, phase='build')
+        counter = Counter('test_total', 'Test "lookups".', ['result'])
+        counter.inc(result='hit')
+        counter.inc(2, result='hit')
+
+        self.assertEqual(histogram.render(), [
+            '# HELP test_seconds Test timings.',
+            '# TYPE test_seconds histogram',
+            'test_seconds_bucket{phase="build",le="0.1"} 1',
+            'test_seconds_bucket{phase="build",le="1"} 2',
+            'test_seconds_bucket{phase="build",le="+Inf"} 3',
+            'test_seconds_sum{phase="build"} 5.55',
+            'test_seconds_count{phase="build"} 3',
+        ])
+        self.assertEqual(counter.render()[2], 'test_total{result="hit"} 3')
+        self.assertEqual(counter.value(result='hit'), 3)
+        self.assertIn('# TYPE test_seconds histogram', metrics.render())
+
+    def test_drain_and_merge(self):
+        """Test that what one process drains adds up in another."""
+        worker = Histogram('test_seconds', 'Test timings.', ['phase'], buckets=(0.1, 1))
+        worker.observe(0.05, phase='build')
+        worker.observe(5, phase='build')
+        counter = Counter('test_total', 'Test lookups.', ['result'])
+        counter.inc(result='hit')
+        drained = {'test_seconds': worker.drain(), 'test_total': counter.drain()}
+        self.assertEqual((worker.count(phase='build'), counter.value(result='hit')), (0, 0))
+
+        worker.observe(0.5, phase='build')
+        metrics.merge(drained)
+        self.assertEqual(worker.count(phase='build'), 3)
+        self.assertEqual(worker.render()[2:5], ['test_seconds_bucket{phase="build",le="0.1"} 1',
+                                                'test_seconds_bucket{phase="build",le="1"} 2',
+                                                'test_seconds_bucket{phase="build",le="+Inf"} 3'])
+        self.assertEqual(counter.value(result='hit'), 1)
+
+    def test_solve_records_phases_solver_and_caches(self):
+        """Test that a cached template solve records the build phases, the model size, the solver and the cache lookups."""
+        cache = PlanCache()
+        builds = PHASE_SECONDS.count(model='model3', phase='objective')
+        solves = SOLVER_SECONDS.count(model='model3')
+        optimal = SOLVES.value(model='model3', status=2)
+        misses = CACHE_REQUESTS.value(cache='plan', result='miss')
+        hits = CACHE_REQUESTS.value(cache='plan', result='hit')
+        template_hits = CACHE_REQUESTS.value(cache='template', result='hit')
+
+        # the same student three times, the last one past the plan cache
+        for solve_cache in (cache, cache, None):
+            scheduler = CourseScheduler(courses=cs_courses, completed=['ENGL101'], required=cs_courses.keys(),
+                                        max=180, min=12, semesters=15, starting=2)
+            self.assertIsNotNone(scheduler.solve_plan(template='metrics', cache=solve_cache, **PLAN_OPTIONS))
+            scheduler.dispose()
+
+        # the template was built once (with build_model3) and copied twice
+        self.assertEqual(PHASE_SECONDS.count(model='model3', phase='objective'), builds + 1)
+        self.assertGreaterEqual(PHASE_SECONDS.count(model='model3_template', phase='copy'), 2)
+        self.assertEqual(CACHE_REQUESTS.value(cache='template', result='hit'), template_hits + 1)
+        self.assertEqual(SOLVER_SECONDS.count(model='model3'), solves + 2)
+        self.assertEqual(SOLVES.value(model='model3', status=2), optimal + 2)
+        self.assertGreater(MODEL_SIZE.count(model='model3', kind='quadratic_terms'), 0)
+        self.assertEqual(CACHE_REQUESTS.value(cache='plan', result='miss'), misses + 1)
+        self.assertEqual(CACHE_REQUESTS.value(cache='plan', result='hit'), hits + 1)
+
+    def test_metrics_endpoint(self):
+        """Test that an instrumented app times its requests and templates and serves /metrics."""
+        app = Flask(__name__)
+        instrument(app)
+
+        @app.route('/hello')
+        def hello():
+            return render_template_string('hello {{ name }}', name='metrics')
+
+        client = app.test_client()
+        self.assertEqual(client.get('/hello').data, b'hello metrics')
+        response = client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain; version=0.0.4'))
+        text = response.get_data(as_text=True)
+        self.assertIn('server_request_seconds_count{endpoint="hello"}', text)
+        self.assertIn('# TYPE scheduler_phase_seconds histogram', text)
+        self.assertIn('# TYPE scheduler_cache_requests_total counter', text)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,115 @@
+import unittest
+import sys
+import os
+import json
+from unittest.mock import patch
+
+# Add the current directory to the path so we can import plan_api
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+import plan_api
+from scheduler import CourseScheduler
+from scheduler_data import cs_courses
+
+STUDENT = {'major': 0, 'completed': 'ENGL101, GENS101', 'completed_semesters': 1}
+
+
+class TestPlanApi(unittest.TestCase):
+
+    def setUp(self):
+        app = Flask(__name__)
+        # a cache of its own in memory so nothing comes from (or goes to) the server's plan_cache.db
+        app.config['PLAN_CACHE_PATH'] = None
+        app.register_blueprint(plan_api.plan_api)
+        self.client = app.test_client()
+
+    def test_plan_with_etag(self):
+        """Test that a solved plan comes with an ETag and the same request with it is a 304 without a solve."""
+        response = self.client.post('/api/plan', data=STUDENT)
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertTrue(data['found'])
+        self.assertEqual(set(data['plan']), set(cs_courses) - {'ENGL101', 'GENS101'})
+        etag = response.headers['ETag']
+
+        with patch.object(CourseScheduler, 'solve_plan', return_value={}) as solve_plan:
+            again = self.client.post('/api/plan', data=STUDENT, headers={'If-None-Match': etag})
+            self.assertEqual(again.status_code, 304)
+            self.assertEqual(again.headers['ETag'], etag)
+            self.assertEqual(again.data, b'')
+            # the same history given another way has the same ETag
+            same = self.client.get('/api/plan', query_string={'major': 0, 'completed': 'gens101,engl101', 'completed_semesters': 1},
+                                   headers={'If-None-Match': etag})
+            self.assertEqual(same.status_code, 304)
+            solve_plan.assert_not_called()
+
+            other = self.client.post('/api/plan', data=dict(STUDENT, completed_semesters=2), headers={'If-None-Match': etag})
+            self.assertEqual(other.status_code, 200)
+            solve_plan.assert_called_once()
+
+    def test_plan_cut_short_has_no_etag(self):
+        """Test that a plan stopped by the time limit before it was proved optimal gets no ETag."""
+        def cut_short(scheduler, **options):
+            scheduler.plan = {course: 2 for course in scheduler.remaining_courses}
+            scheduler.plan_gap = 0.25
+            return scheduler.plan
+
+        with patch.object(CourseScheduler, 'solve_plan', autospec=True, side_effect=cut_short):
+            response = self.client.post('/api/plan', data=STUDENT)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['gap'], 0.25)
+        self.assertNotIn('ETag', response.headers)
+
+    def test_timetable_with_etag(self):
+        """Test that a timetable comes with an ETag and is a 304 when it's sent back."""
+        response = self.client.post('/api/timetable', data=STUDENT)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.get_json()['found'])
+        etag = response.headers['ETag']
+
+        with patch.object(CourseScheduler, 'solve_timetable') as solve_timetable:
+            again = self.client.post('/api/timetable', data=STUDENT, headers={'If-None-Match': etag})
+            self.assertEqual(again.status_code, 304)
+            solve_timetable.assert_not_called()
+
+    def test_bad_requests(self):
+        """Test that missing or malformed students are a 400 with the reason."""
+        for path in ['/api/plan', '/api/timetable']:
+            for data in [{}, {'major': 'x'}, {'major': 9}, dict(STUDENT, completed_semesters=-1)]:
+                response = self.client.post(path, data=data)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.get_json())
+
+        response = self.client.get('/api/jobs/nope/events')
+        self.assertEqual(response.status_code, 404)
+
+    def test_plan_stream(self):
+        """Test that the plan stream ends with the final plan, and that bad fields are a 400 before anything runs."""
+        response = self.client.post('/plan/stream', data=STUDENT)
+        self.assertEqual(response.status_code, 200)
+        events = response.get_data(as_text=True).strip().split('\n\n')
+        self.assertTrue(events[-1].startswith('event: done\n'))
+        self.assertTrue(json.loads(events[-1].split('data: ', 1)[1])['found'])
+
+        for data in [dict(STUDENT, completed_semesters='two'), dict(STUDENT, completed_semesters=-1), dict(STUDENT, time_limit='0')]:
+            response = self.client.post('/plan/stream', data=data)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('error', response.get_json())
+
+    def test_timetable_options(self):
+        """Test that the timetable options stream one ranked timetable per line."""
+        response = self.client.post('/next_semester/options', data=dict(STUDENT, k=3))
+        self.assertEqual(response.status_code, 200)
+        options = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual([option['rank'] for option in options], [1, 2, 3])
+        self.assertTrue(all(option['timetable'] for option in options))
+
+        for k in ['three', '2.5', '']:
+            response = self.client.post('/next_semester/options', data=dict(STUDENT, k=k))
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('error', response.get_json())
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,86 @@
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+
+# Add the current directory to the path so we can import plan_cache
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from plan_cache import PlanCache, catalog_version, plan_key
+from registry import REGISTRY
+from scheduler import CourseScheduler
+from scheduler_data import cs_courses
+
+
+class TestPlanCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, 'plans.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_plan_key(self):
+        """Test that the key ignores the order of the inputs but not their values."""
+        version = catalog_version(cs_courses)
+        key = plan_key(version, completed={'MATH111', 'ENGL101'}, starting=2, options={'windows': True, 'beta': 0})
+        self.assertEqual(key, plan_key(version, starting=2, completed=['ENGL101', 'MATH111'], options={'beta': 0, 'windows': True}))
+        self.assertNotEqual(key, plan_key(version, completed={'MATH111'}, starting=2, options={'windows': True, 'beta': 0}))
+        self.assertNotEqual(key, plan_key('other', completed={'MATH111', 'ENGL101'}, starting=2, options={'windows': True, 'beta': 0}))
+
+    def test_catalog_version(self):
+        """Test that changing the course data changes its version."""
+        courses = REGISTRY.major(cs_courses)
+        self.assertEqual(catalog_version(courses), catalog_version(cs_courses))
+        courses = REGISTRY.major(cs_courses, overlay={'COSC114': {'importance': 40}})
+        self.assertNotEqual(catalog_version(courses), catalog_version(cs_courses))
+
+    def test_lru_and_sqlite(self):
+        """Test the bounded memory part and the sqlite table behind it."""
+        cache = PlanCache(self.path, size=2)
+        for i in range(3):
+            cache.put(f'key{i}', 'v1', {'COSC114': i + 1})
+        self.assertEqual(list(cache.memory), ['key1', 'key2'])
+        self.assertEqual(len(cache), 3)
+
+        # Evicted from memory but still in sqlite, and a new process sees all of them
+        self.assertEqual(cache.get('key0'), {'COSC114': 1})
+        self.assertEqual(list(cache.memory), ['key2', 'key0'])
+        self.assertEqual(PlanCache(self.path).get('key1'), {'COSC114': 2})
+        self.assertIsNone(cache.get('nope'))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+        cache.put('key3', 'v2', {'COSC114': 4})
+        cache.prune(['v2'])
+        self.assertEqual(len(cache), 1)
+        self.assertIsNone(cache.get('key0'))
+        self.assertEqual(cache.get('key3'), {'COSC114': 4})
+
+    def test_solve_plan_uses_cache(self):
+        """Test that a repeated plan request doesn't reach the solver."""
+        cache = PlanCache(self.path)
+        options = dict(backend='gurobi', cache=cache, alpha=0, beta=0, gamma=80, delta=30, windows=True, min_horizon=12)
+        first = CourseScheduler(courses=cs_courses, completed=['GENS101', 'ENGL101'], required=cs_courses.keys(),
+                                max=180, min=12, semesters=15, starting=2)
+        plan = first.solve_plan(**options)
+        self.assertIsNotNone(first.model3)
+
+        again = CourseScheduler(courses=cs_courses, completed=['ENGL101', 'GENS101'], required=cs_courses.keys(),
+                                max=180, min=12, semesters=15, starting=2)
+        self.assertEqual(again.solve_plan(**options), plan)
+        self.assertIsNone(again.model3)
+        self.assertEqual(again.plan_gap, 0)
+
+        # Different course data misses
+        courses = REGISTRY.major(cs_courses, overlay={'HUMA123': {'year': 4}})
+        changed = CourseScheduler(courses=courses, completed=['GENS101', 'ENGL101'], required=courses.keys(),
+                                  max=180, min=12, semesters=15, starting=2)
+        changed.solve_plan(**options)
+        self.assertIsNotNone(changed.model3)
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
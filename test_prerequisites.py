@@ -0,0 +1,74 @@
+import unittest
+import sys
+import os
+
+# Add the current directory to the path so we can import prerequisites
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from prerequisites import all_dependents, completed_signature, course_importance, dependents_closure, normalize_completed, parse_codes, topological_order
+from scheduler import CourseScheduler
+from scheduler_data import ce_courses, cs_courses
+
+
+class TestCompletedCanonicalization(unittest.TestCase):
+
+    def test_parse_codes(self):
+        """Test reading the comma separated codes students type."""
+        self.assertEqual(parse_codes(' cosc 101, MATH111,,engr399(2) '), {'COSC101', 'MATH111', 'ENGR399(2)'})
+        self.assertEqual(parse_codes(''), set())
+
+    def test_normalize_completed(self):
+        """Test dropping unknown codes and folding in implied prerequisites."""
+        completed = normalize_completed(cs_courses, {'ENGL102', 'XYZ999'})
+        self.assertEqual(completed, ('ENGL101', 'ENGL102'))
+
+        # Every prerequisite of a completed course is completed, all the way down
+        completed = normalize_completed(cs_courses, {'COSC201'})
+        for course in completed:
+            for prereq in cs_courses[course]['prerequisites']:
+                self.assertIn(prereq, completed)
+        self.assertEqual(list(completed), sorted(completed))
+
+    def test_equivalent_histories_share_signature(self):
+        """Test that equivalent histories get the same signature and others don't."""
+        first = normalize_completed(cs_courses, parse_codes('ENGL102, ENGL101'))
+        second = normalize_completed(cs_courses, parse_codes('engl102,NOPE100'))
+        self.assertEqual(completed_signature(cs_courses, first), completed_signature(cs_courses, second))
+        self.assertNotEqual(completed_signature(cs_courses, first), completed_signature(cs_courses, {'ENGL101'}))
+        self.assertEqual(completed_signature(cs_courses, set()), '0')
+        self.assertEqual(int(completed_signature(ce_courses, set(ce_courses)), 16), (1 << len(ce_courses)) - 1)
+
+
+class TestDependentsClosure(unittest.TestCase):
+
+    def test_matches_search(self):
+        """Test the closure against a search from every course."""
+        for courses in [cs_courses, ce_courses]:
+            for target in courses:
+                expected = {c for c in courses if CourseScheduler.is_depndent(c, target, courses)}
+                self.assertEqual(all_dependents(courses, target), expected)
+            importance = course_importance(courses)
+            self.assertEqual(importance['COSC497'], 1 + len(all_dependents(courses, 'COSC497')))
+
+    def test_topological_order(self):
+        """Test that prerequisites come first and that cycles are refused."""
+        graph = {'A': [], 'B': ['A'], 'C': ['A', 'B'], 'D': ['C']}
+        order = topological_order(graph)
+        for course, prereqs in graph.items():
+            for prereq in prereqs:
+                self.assertLess(order.index(prereq), order.index(course))
+        with self.assertRaises(ValueError):
+            topological_order({'A': ['C'], 'B': ['A'], 'C': ['B']})
+
+    def test_cached_per_graph(self):
+        """Test that the closure is reused until the prerequisites change."""
+        courses = {'A': {'prerequisites': []}, 'B': {'prerequisites': ['A']}}
+        first = dependents_closure(courses)
+        courses['B']['importance'] = 5
+        self.assertIs(dependents_closure(courses), first)
+        courses['C'] = {'prerequisites': ['B']}
+        self.assertEqual(all_dependents(courses, 'A'), {'B', 'C'})
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
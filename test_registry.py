@@ -0,0 +1,79 @@
+import unittest
+import sys
+import os
+import copy
+import pickle
+
+# Add the current directory to the path so we can import registry
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from registry import REGISTRY, CourseRecord, CourseRegistry
+from scheduler import CourseScheduler
+from scheduler_data import ce_courses, cs_courses, time_data
+
+
+class TestCourseRegistry(unittest.TestCase):
+
+    def test_record_reads_like_a_dict(self):
+        """Test that a record answers the same lookups as the course dict it came from."""
+        fields = {'name': 'internship 1', 'credits': 1, 'prerequisites': [], 'weight': 1, 'year': 3,
+                  'min_credits': 60, 'available_in': {'summer'}}
+        record = CourseRegistry().record('ENGR399', fields)
+        self.assertEqual(record, dict(fields, prerequisites=()))
+        self.assertEqual(record['credits'], 1)
+        self.assertEqual(record.min_credits, 60)
+        self.assertEqual(record.get('sections', ['default']), ['default'])
+        self.assertIn('min_credits', record)
+        self.assertNotIn('sections', record)
+        self.assertNotIn('id', record)
+        with self.assertRaises(KeyError):
+            record['importance']
+        with self.assertRaises(AttributeError):
+            record.credits = 4
+        with self.assertRaises(TypeError):
+            record['credits'] = 4
+        with self.assertRaises(ValueError):
+            CourseRegistry().record('X', {'credit': 3})
+
+    def test_majors_share_records(self):
+        """Test that equal courses are one record and overlays only change what they name."""
+        self.assertIs(ce_courses['COSC114'], cs_courses['COSC114'])
+        self.assertEqual(ce_courses['TECH_ELECTIVE_1']['name'], 'Feras elective')
+        self.assertEqual(cs_courses['TECH_ELECTIVE_1']['name'], 'Technical Elective 1')
+        self.assertEqual(ce_courses['TECH_ELECTIVE_1'].id, cs_courses['TECH_ELECTIVE_1'].id)
+
+        # time_data has sections for COSC114, so it's another record with the same id
+        self.assertIsNot(time_data['COSC114'], cs_courses['COSC114'])
+        self.assertEqual(time_data['COSC114'].id, cs_courses['COSC114'].id)
+        self.assertEqual(REGISTRY.codes[cs_courses['HUMA123'].id], 'HUMA123')
+        self.assertEqual(sorted(REGISTRY.ids.values()), list(range(len(REGISTRY.codes))))
+
+        # dicts made into records again give back the same objects
+        plain = {code: dict(info) for code, info in cs_courses.items()}
+        self.assertTrue(all(REGISTRY.major(plain)[code] is cs_courses[code] for code in cs_courses))
+
+    def test_copies_and_pickles(self):
+        """Test that copies are the record itself and pickles keep the id."""
+        record = cs_courses['ENGR399']
+        self.assertIs(copy.deepcopy(record), record)
+        again = pickle.loads(pickle.dumps(record))
+        self.assertIsInstance(again, CourseRecord)
+        self.assertEqual((again.id, again.code, dict(again)), (record.id, record.code, dict(record)))
+
+    def test_scheduler_takes_dicts_or_records(self):
+        """Test that the scheduler keeps records as they are and turns dicts into records."""
+        scheduler = CourseScheduler(courses=cs_courses, completed=[], required=cs_courses.keys())
+        self.assertIs(scheduler.courses, cs_courses)
+
+        scheduler = CourseScheduler(courses={'A': {'credits': 3, 'prerequisites': []}}, completed=[], required=['A'])
+        self.assertIsInstance(scheduler.courses['A'], CourseRecord)
+
+        # importance goes on new records, the shared ones keep none
+        scheduler = CourseScheduler(courses=cs_courses, completed=[], required=cs_courses.keys())
+        scheduler.assign_importance()
+        self.assertGreater(scheduler.courses['COSC114'].importance, 1)
+        self.assertIsNone(cs_courses['COSC114'].importance)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,92 @@
+# exact timetable search without a solver, used by CourseScheduler.solve_timetable
+# a domain is {course: [(mask, picks), ...]} where mask is the slot bitmask of the option
+# (see CourseScheduler.convert_to_mask) and picks are the (course, section) keys it uses
+import heapq
+
+
+class SearchTooLarge(Exception):
+    pass
+
+
+def search_space(domains):
+    size = 1
+    for options in domains.values():
+        size *= len(options)
+    return size
+
+
+def search_timetable(domains, max_nodes=100000):
+    # backtracking over the slot masks, always branching on the course with the fewest options left
+    # and removing clashing options from the other courses after every pick (forward checking).
+    # returns the list of picks, or None if there is no timetable without conflicts
+    nodes = [0]
+
+    def search(domains):
+        if not domains:
+            return []
+        course = min(domains, key=lambda c: len(domains[c]))
+        for mask, picks in domains[course]:
+            nodes[0] += 1
+            if nodes[0] > max_nodes:
+                raise SearchTooLarge(f"more than {max_nodes} nodes")
+            rest = {}
+            for other, options in domains.items():
+                if other == course:
+                    continue
+                left = [option for option in options if not option[0] & mask]
+                if not left:
+                    break
+                rest[other] = left
+            else:
+                found = search(rest)
+                if found is not None:
+                    return list(picks) + found
+        return None
+
+    return search(domains)
+
+
+def iter_timetables(domains, max_nodes=100000):
+    # same search as search_timetable but keeps going and yields every timetable as (mask, picks)
+    nodes = [0]
+
+    def search(domains, mask_so_far):
+        if not domains:
+            yield mask_so_far, []
+            return
+        course = min(domains, key=lambda c: len(domains[c]))
+        for mask, picks in domains[course]:
+            nodes[0] += 1
+            if nodes[0] > max_nodes:
+                raise SearchTooLarge(f"more than {max_nodes} nodes")
+            rest = {}
+            for other, options in domains.items():
+                if other == course:
+                    continue
+                left = [option for option in options if not option[0] & mask]
+                if not left:
+                    break
+                rest[other] = left
+            else:
+                for total, found in search(rest, mask_so_far | mask):
+                    yield total, list(picks) + found
+
+    yield from search(domains, 0)
+
+
+def timetable_score(mask, day_offsets, day_mask):
+    # lower is better: days on campus first, then the hours spent there from first to last class
+    days = 0
+    span = 0
+    for offset in day_offsets.values():
+        bits = (mask >> offset) & day_mask
+        if bits:
+            days += 1
+            span += bits.bit_length() - ((bits & -bits).bit_length() - 1)
+    return days, span
+
+
+def best_timetables(domains, k, day_offsets, day_mask, max_nodes=100000):
+    # the k best distinct timetables, best first, as (score, picks)
+    found = ((timetable_score(mask, day_offsets, day_mask), picks) for mask, picks in iter_timetables(domains, max_nodes))
+    return heapq.nsmallest(k, found, key=lambda item: item[0])